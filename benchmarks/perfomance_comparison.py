@@ -3,7 +3,7 @@ import json
 from timeit import timeit
 import unittest
 
-from scalpl import Cut
+from scalpl import Cut, LazyCut
 
 from addict import Dict
 from box import Box
@@ -157,6 +157,42 @@ class TestBoxPerformance(TestDictPerformance):
         self.execute(statement, 'set through list - 2nd lookup')
 
 
+class TestLazyCutPerformance(unittest.TestCase):
+    """
+        Compare reading a few fields of a raw JSON listing, whose
+        children repeat the same key names, with decoding it whole.
+    """
+
+    def setUp(self):
+        listing = deepcopy(TestDictPerformance.PYTHON_REDDIT)
+        listing['data']['children'] *= 250
+        self.document = json.dumps(listing)
+        self.namespace = {'self': self, 'json': json, 'LazyCut': LazyCut}
+
+    def execute(self, statement, method):
+        n = 100
+        time = timeit(statement, globals=self.namespace, number=n)
+        print('# ', method, ': ', int(1 / (time/n)), ' ops per second.')
+
+    def test_getitem_through_list(self):
+        self.execute(
+            "json.loads(self.document)['data']['children'][0]['data']['author']",
+            'json.loads - get through list'
+        )
+        self.execute(
+            "LazyCut.from_json(self.document)['data.children[0].data.author']",
+            'LazyCut - get through list'
+        )
+
+    def test_getitem_many(self):
+        statement = (
+            "proxy = LazyCut.from_json(self.document); proxy['kind']; "
+            "proxy['data.modhash']; proxy['data.children[0].data.id']; "
+            "proxy['data.children[3].data.score']"
+        )
+        self.execute(statement, 'LazyCut - get 4 fields')
+
+
 class TestAddictPerformance(TestDictPerformance):
 
     namespace = {
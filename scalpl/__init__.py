@@ -1,3 +1,10 @@
 from .scalpl import Cut
+from .adapters import Adapter, register_adapter
+from .interner import Interner
+from .lazy import LazyCut
+from .pipeline import Pipeline
+from .query import compile_query
+from .records import group_by, sort_by, top_k
+from .validator import Validator
 
 __version__ = "0.4.2"
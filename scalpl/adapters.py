@@ -0,0 +1,138 @@
+"""
+    Adapters to operate on containers which are not dicts or lists.
+"""
+from typing import Dict, Optional
+
+
+class Adapter:
+    """
+    How to get, set and delete the items of a container type. Methods raise
+    KeyError or IndexError for missing items, and TypeError for unsupported
+    keys, as dicts and lists do.
+
+    ex:
+        class RowAdapter(Adapter):
+            def get(self, container, key):
+                return container.column(key)
+            ...
+
+        register_adapter(Row, RowAdapter())
+    """
+
+    __slots__ = ()
+
+    def get(self, container, key):
+        raise TypeError(f"'{type(container).__name__}' items cannot be read")
+
+    def set(self, container, key, value) -> None:
+        raise TypeError(f"'{type(container).__name__}' items cannot be set")
+
+    def delete(self, container, key) -> None:
+        raise TypeError(f"'{type(container).__name__}' items cannot be deleted")
+
+    def contains(self, container, key) -> bool:
+        try:
+            self.get(container, key)
+        except (KeyError, IndexError):
+            return False
+        return True
+
+
+class AttributeAdapter(Adapter):
+    """
+    Access the attributes of an object as its items: the fields of
+    dataclasses and namedtuples, and the slots of objects.
+    """
+
+    __slots__ = ()
+
+    def get(self, container, key):
+        if not isinstance(key, str):
+            raise TypeError(f"attribute name must be a string, not '{type(key)}'")
+        try:
+            return getattr(container, key)
+        except AttributeError as error:
+            raise KeyError(key) from error
+
+    def set(self, container, key, value) -> None:
+        if not isinstance(key, str):
+            raise TypeError(f"attribute name must be a string, not '{type(key)}'")
+        setattr(container, key, value)
+
+    def delete(self, container, key) -> None:
+        if not self.contains(container, key):
+            raise KeyError(key)
+        delattr(container, key)
+
+
+ATTRIBUTES = AttributeAdapter()
+
+_REGISTRY = {}  # type: Dict[type, Adapter]
+# The adapter resolved for each type met so far, or None, so that the MRO
+# of a type is only searched once.
+_DISPATCH = {}  # type: Dict[type, Optional[Adapter]]
+
+
+def register_adapter(cls: type, adapter: Adapter) -> None:
+    """Operate on the instances of `cls`, and of its subclasses, with `adapter`."""
+    _REGISTRY[cls] = adapter
+    _DISPATCH.clear()
+
+
+def adapter_for(cls: type) -> Optional[Adapter]:
+    """Return the adapter of a type, or None when it has none."""
+    try:
+        return _DISPATCH[cls]
+    except KeyError:
+        pass
+
+    adapter = None  # type: Optional[Adapter]
+    for base in cls.__mro__:
+        if base in _REGISTRY:
+            adapter = _REGISTRY[base]
+            break
+    else:
+        if (
+            hasattr(cls, "__dataclass_fields__")
+            or (hasattr(cls, "__slots__") and not hasattr(cls, "__getitem__"))
+            or (issubclass(cls, tuple) and hasattr(cls, "_fields"))
+        ):
+            adapter = ATTRIBUTES
+
+    _DISPATCH[cls] = adapter
+    return adapter
+
+
+def get_item(container, key):
+    """Return `container[key]`, through the adapter of its type if needed."""
+    try:
+        return container[key]
+    except TypeError:
+        adapter = adapter_for(type(container))
+        if adapter is None:
+            raise
+    return adapter.get(container, key)
+
+
+def set_item(container, key, value) -> None:
+    """Set `container[key]`, through the adapter of its type if needed."""
+    try:
+        container[key] = value
+        return
+    except TypeError:
+        adapter = adapter_for(type(container))
+        if adapter is None:
+            raise
+    adapter.set(container, key, value)
+
+
+def delete_item(container, key) -> None:
+    """Delete `container[key]`, through the adapter of its type if needed."""
+    try:
+        del container[key]
+        return
+    except TypeError:
+        adapter = adapter_for(type(container))
+        if adapter is None:
+            raise
+    adapter.delete(container, key)
@@ -0,0 +1,120 @@
+"""
+    Share equal keys and immutable values across documents.
+"""
+from collections.abc import MutableMapping, MutableSequence
+import sys
+from typing import Any, Dict, Tuple
+
+_SHAREABLE = {str, bytes, int, float, complex, bool, type(None), tuple}
+# Lazy nodes of a LazyCut, and other mutable containers, are compacted too.
+_CONTAINERS = (dict, list, MutableMapping, MutableSequence)
+
+
+class Interner:
+    """
+    Interner keeps a canonical instance of the keys and immutable values it
+    meets, so that documents compacted with the same Interner store each of
+    them once.
+
+    Dict keys, strings and bytes up to `max_length`, numbers and tuples of
+    interned values are shared; dicts and lists, being mutable, never are.
+
+    ex:
+        interner = Interner()
+        for document in documents:
+            interner.compact(document)
+        interner.saved
+        # 1048576
+    """
+
+    __slots__ = ("max_length", "saved", "_table")
+
+    def __init__(self, max_length: int = 64) -> None:
+        self.max_length = max_length
+        # An estimation of the bytes saved so far: the size of the objects
+        # replaced by their canonical instance.
+        self.saved = 0
+        self._table = {}  # type: Dict[Tuple[type, Any], Any]
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def _canonical(self, value, key=False):
+        """Return the canonical instance of `value`, or `value` itself."""
+        kind = type(value)
+        if kind is str:
+            if key:
+                value = sys.intern(value)
+            elif len(value) > self.max_length:
+                return value
+        elif kind is bytes:
+            if len(value) > self.max_length:
+                return value
+        elif kind is tuple:
+            items = tuple(self._canonical(item) for item in value)
+            if not all(type(item) in _SHAREABLE for item in items):
+                return value
+            if all(new is item for new, item in zip(items, value)):
+                items = value
+            # Items are canonical already: comparing their identity keeps
+            # apart tuples that are equal but hold values of other types.
+            return self._table.setdefault((tuple, tuple(map(id, items))), items)
+        elif kind not in _SHAREABLE or value != value:
+            # NaN never equals itself, so it could not be found back.
+            return value
+        elif kind is float or kind is complex:
+            # -0.0 equals 0.0 but is a different value: the exact spelling
+            # of the number keeps signed zeros apart.
+            return self._table.setdefault((kind, repr(value)), value)
+
+        return self._table.setdefault((kind, value), value)
+
+    def intern(self, value):
+        """Return the canonical instance of a key or an immutable value."""
+        canonical = self._canonical(value)
+        if canonical is not value:
+            self.saved += sys.getsizeof(value)
+        return canonical
+
+    def compact(self, data) -> int:
+        """
+        Replace, in place, the keys and the immutable values of nested dicts
+        and lists by their canonical instance, and return the bytes saved.
+        """
+        saved = self.saved
+        canonical = self._canonical
+        seen = set()
+        stack = [data]
+        while stack:
+            container = stack.pop()
+            if id(container) in seen:
+                continue
+            seen.add(id(container))
+
+            if isinstance(container, MutableMapping):
+                items = [
+                    (canonical(key, key=True), key, value)
+                    for key, value in container.items()
+                ]
+                replaced = [key for new, key, _ in items if new is not key]
+                if replaced:
+                    # Keys are replaced all at once to keep their order.
+                    self.saved += sum(map(sys.getsizeof, replaced))
+                    container.clear()
+                    container.update((new, value) for new, _, value in items)
+                children = [(new, value) for new, _, value in items]  # type: Any
+            elif isinstance(container, MutableSequence):
+                children = enumerate(list(container))
+            else:
+                continue
+
+            for key, value in children:
+                if isinstance(value, _CONTAINERS):
+                    stack.append(value)
+                    continue
+                new = canonical(value)
+                if new is not value:
+                    self.saved += sys.getsizeof(value)
+                    container[key] = new
+
+        return self.saved - saved
@@ -0,0 +1,504 @@
+"""
+    A Cut over a raw JSON document, parsed only where paths lead to.
+"""
+from collections.abc import MutableMapping, MutableSequence
+from functools import lru_cache
+from itertools import islice
+from json import JSONDecodeError, JSONDecoder
+from json.decoder import scanstring  # type: ignore
+import re
+import sys
+from typing import List, Optional, Pattern, Tuple, Union
+
+from .scalpl import Cut, split_path, traverse
+
+TDocument = Union[bytes, bytearray, memoryview, str]
+
+_DECODER = JSONDecoder()
+_MISSING = object()
+# Patterns never need to backtrack: possessive quantifiers, where supported,
+# spare the regex engine from saving states to backtrack to.
+_ONCE = "+" if sys.version_info >= (3, 11) else ""
+_WS = rf"[ \t\n\r]*{_ONCE}"
+_STRING = rf'"[^"]*{_ONCE}"'
+_OTHER = rf'[^"\[\]{{}}]*{_ONCE}'
+_MAX_DEPTH = 16
+_DEEP_MAX_DEPTH = 64
+
+
+def _nested(depth: int) -> str:
+    """A pattern matching the containers nested up to `depth` levels deep."""
+    inner = _STRING if not depth else f"(?:{_STRING}|{_nested(depth - 1)})"
+    return rf"[\[{{]{_OTHER}(?:{inner}{_OTHER})*{_ONCE}[\]}}]"
+
+
+class _Patterns:
+    """
+    The patterns matching whole values, which nesting makes long to
+    compile: they are only compiled once a document is read.
+    """
+
+    __slots__ = ("value", "member", "members", "item")
+
+    def __init__(self) -> None:
+        value = rf'{_STRING}|{_nested(_MAX_DEPTH)}|[^ \t\n\r,\]}}\[{{"]+{_ONCE}'
+        # A whole member or item, followed by its comma unless it is last.
+        member = rf'"([^"]*{_ONCE})"{_WS}:{_WS}({value}){_WS}(?:,{_WS}(?=")|(?=}}))'
+        self.value = re.compile(value)
+        self.member = re.compile(member)
+        self.members = re.compile(rf"(?:{member})*{_ONCE}")
+        self.item = re.compile(rf"({value}){_WS}(?:,{_WS}(?!\])|(?=\]))")
+
+
+@lru_cache(maxsize=None)
+def _patterns() -> _Patterns:
+    return _Patterns()
+
+
+@lru_cache(maxsize=None)
+def _deep_container() -> Pattern:
+    """The pattern matching containers too deep for the others, once met."""
+    return re.compile(_nested(_DEEP_MAX_DEPTH))
+
+
+# Patterns are matched against the skeleton of a document, where strings
+# always end at the next quote.
+_UNTIL_BRACKET = re.compile(rf"{_OTHER}(?:{_STRING}{_OTHER})*{_ONCE}")
+_KEY = re.compile(rf'"([^"]*{_ONCE})"{_WS}:{_WS}')
+_WHITESPACE = re.compile(_WS)
+_NEEDS_ESCAPE = re.compile(r'["\\\x00-\x1f]')
+
+
+class _Source:
+    """
+    A JSON document, along with its skeleton: the same text where escaped
+    backslashes and quotes are blanked out, so that patterns can tell where
+    strings end without decoding them.
+    """
+
+    __slots__ = ("text", "skeleton")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.skeleton = text
+        if "\\" in text:
+            self.skeleton = text.replace("\\\\", "  ").replace('\\"', "  ")
+
+
+def _skip(source: _Source, pos: int) -> int:
+    """
+    Return the position right after the JSON value starting at `pos`,
+    without decoding it or building any object from it.
+    """
+    skeleton = source.skeleton
+    match = _patterns().value.match(skeleton, pos)
+    if match is not None:
+        return match.end()
+    if skeleton[pos] == '"':
+        raise JSONDecodeError("Unterminated string", source.text, pos)
+    if skeleton[pos] not in "[{":
+        raise JSONDecodeError("Expecting value", source.text, pos)
+    container = _deep_container()
+    match = container.match(skeleton, pos)
+    if match is not None:
+        return match.end()
+
+    # Containers nested deeper still are walked over from one bracket to
+    # the next, until their children are shallow enough.
+    depth = 0
+    while True:
+        pos = _UNTIL_BRACKET.match(skeleton, pos).end()  # type: ignore
+        char = skeleton[pos]
+        if char in "[{":
+            match = container.match(skeleton, pos) if depth else None
+            if match is not None:
+                pos = match.end()
+                continue
+            depth += 1
+        elif char in "]}":
+            depth -= 1
+            if not depth:
+                return pos + 1
+        else:
+            raise JSONDecodeError("Unterminated string", source.text, pos)
+        pos += 1
+
+
+def _skip_separator(source: _Source, pos: int, closing: str) -> int:
+    """
+    Move after the comma following a member, or return -1 when `pos`
+    points to the closing bracket of the container.
+    """
+    skeleton = source.skeleton
+    pos = _WHITESPACE.match(skeleton, pos).end()  # type: ignore
+    char = skeleton[pos]
+    if char == ",":
+        return _WHITESPACE.match(skeleton, pos + 1).end()  # type: ignore
+    if char == closing:
+        return -1
+    raise JSONDecodeError("Expecting ',' delimiter", source.text, pos)
+
+
+def _open(source: _Source, pos: int, closing: str) -> int:
+    """Move to the first member of a container, or return -1 if it is empty."""
+    skeleton = source.skeleton
+    pos = _WHITESPACE.match(skeleton, pos + 1).end()  # type: ignore
+    return -1 if skeleton[pos : pos + 1] == closing else pos
+
+
+def _locate_member(source: _Source, pos: int) -> Tuple[str, int]:
+    """Return the key of the member starting at `pos` and where its value starts."""
+    match = _KEY.match(source.skeleton, pos)
+    if match is None:
+        if source.skeleton[pos] != '"':
+            raise JSONDecodeError(
+                "Expecting property name enclosed in double quotes", source.text, pos
+            )
+        raise JSONDecodeError("Expecting ':' delimiter", source.text, pos)
+    key = source.text[match.start(1) : match.end(1)]
+    if "\\" in key:
+        key = scanstring(source.text, match.start(1))[0]
+    return key, match.end()
+
+
+def _quoted(key) -> Optional[str]:
+    """Return how `key` is written as a member name, if it needs no escapes."""
+    if not isinstance(key, str) or _NEEDS_ESCAPE.search(key):
+        return None
+    return f'"{key}"'
+
+
+def _escaped(text: str, quoted: str, start: int, end: Optional[int] = None) -> bool:
+    """
+    Tell whether the member name `quoted` may be written with escapes
+    between `start` and `end`; only \\u and \\/ can spell a name which
+    needs no escapes.
+    """
+    if text.find("\\u", start, end) != -1:
+        return True
+    return "/" in quoted and text.find("\\/", start, end) != -1
+
+
+def _unexpected_end(text: str) -> JSONDecodeError:
+    return JSONDecodeError("Unexpected end of document", text, len(text))
+
+
+class _Pending:
+    """Position of a JSON value that has not been parsed yet."""
+
+    __slots__ = ("start",)
+
+    def __init__(self, start: int) -> None:
+        self.start = start
+
+
+def _load(source: _Source, start: int):
+    char = source.text[start : start + 1]
+    if char == "{":
+        return LazyObject(source, start)
+    if char == "[":
+        return LazyArray(source, start)
+    return _DECODER.raw_decode(source.text, start)[0]
+
+
+def _materialize(value, text: str):
+    if isinstance(value, _Pending):
+        return _DECODER.raw_decode(text, value.start)[0]
+    if isinstance(value, (LazyObject, LazyArray)):
+        return value.materialize()
+    return value
+
+
+class LazyObject(MutableMapping):
+    """
+    A JSON object whose members are located on demand, and only parsed
+    when a path descends into them.
+    """
+
+    __slots__ = ("_source", "_start", "_members", "_pos", "_last", "_skipped")
+
+    def __init__(self, source: _Source, start: int) -> None:
+        self._source = source
+        self._start = _open(source, start, "}")
+        self._members = {}  # type: dict
+        # Where the members not checked yet start, and where the value of
+        # the last located member starts, which is only skipped over when
+        # looking further.
+        self._pos = self._start
+        self._last = -1
+        # Spans of members checked but not located, while looking past them.
+        self._skipped = []  # type: List[Tuple[int, int]]
+
+    def _locate(self, key) -> None:
+        """
+        Locate the member named `key`, only checking the members written
+        before it: their names and values are matched at once, and they are
+        located later on, if ever.
+        """
+        source, pos, last = self._source, self._pos, self._last
+        text, skeleton, skipped = source.text, source.skeleton, self._skipped
+        quoted = _quoted(key)
+        if quoted is None or any(
+            skeleton.find(quoted, start, end) != -1
+            or _escaped(text, quoted, start, end)
+            for start, end in skipped
+        ):
+            self._scan()
+            return
+
+        members = _patterns().members
+        origin, located, rescan = pos, False, False
+        try:
+            while pos != -1 and not (located or rescan):
+                if last != -1:
+                    pos = _skip_separator(source, _skip(source, last), "}")
+                    last = -1
+                    continue
+
+                candidate = skeleton.find(quoted, pos)
+                if candidate == -1:
+                    # Unless `key` is written with escapes, it is missing.
+                    rescan = _escaped(text, quoted, origin)
+                    break
+
+                # Up to the opening quote of the candidate, which ends the
+                # comma before it.
+                end = members.match(skeleton, pos, candidate + 1).end()  # type: ignore
+                if end > pos:
+                    skipped.append((pos, end))
+                    if end != candidate and skeleton[end] == "}":
+                        rescan = _escaped(text, quoted, origin, end)
+                        pos = -1
+                        break
+
+                member, value = _locate_member(source, end)
+                if end == candidate and member == key:
+                    # The members after it are not checked for duplicates of
+                    # its name until they are scanned.
+                    pos, last, located = end, value, True
+                else:
+                    # The candidate is within the value of this member, or
+                    # the value is nested too deep for the patterns.
+                    after = _skip(source, value)
+                    skipped.append((end, after))
+                    pos = _skip_separator(source, after, "}")
+                    if pos == -1:
+                        rescan = _escaped(text, quoted, origin, after)
+        except IndexError:
+            raise _unexpected_end(text)
+
+        self._pos, self._last = pos, last
+        if rescan:
+            self._scan()
+        elif located:
+            self._members[key] = _Pending(last)
+
+    def _scan(self) -> None:
+        """Locate all the members, in the order they are written."""
+        if self._pos == -1 and not self._skipped:
+            return
+        source, members, pos = self._source, self._members, self._start
+        text, skeleton = source.text, source.skeleton
+        member_pattern = _patterns().member
+        # Like json.loads, the last duplicate of a name wins, unless the value
+        # of a previous one has already been read or written.
+        located = {}  # type: dict
+
+        def locate(member: str, start: int) -> None:
+            value = members.get(member, _MISSING)
+            if value is _MISSING or isinstance(value, _Pending):
+                value = _Pending(start)
+            located[member] = value
+
+        try:
+            while pos != -1:
+                match = None
+                scanner = member_pattern.scanner(skeleton, pos)  # type: ignore
+                for match in iter(scanner.match, None):
+                    member = text[match.start(1) : match.end(1)]
+                    if "\\" in member:
+                        member = scanstring(text, match.start(1))[0]
+                    locate(member, match.start(2))
+                if match is not None:
+                    pos = match.end()
+                    if skeleton[pos] == "}":
+                        break
+
+                member, value = _locate_member(source, pos)
+                locate(member, value)
+                pos = _skip_separator(source, _skip(source, value), "}")
+        except IndexError:
+            raise _unexpected_end(text)
+        self._members, self._pos, self._last, self._skipped = located, -1, -1, []
+
+    def __getitem__(self, key):
+        if key not in self._members and (self._pos != -1 or self._skipped):
+            self._locate(key)
+        members = self._members
+        value = members[key]
+        if isinstance(value, _Pending):
+            value = members[key] = _load(self._source, value.start)
+        return value
+
+    def __setitem__(self, key, value) -> None:
+        if key not in self._members:
+            self._scan()
+        self._members[key] = value
+
+    def __delitem__(self, key) -> None:
+        self._scan()
+        del self._members[key]
+
+    def __iter__(self):
+        self._scan()
+        return iter(self._members)
+
+    def __len__(self) -> int:
+        self._scan()
+        return len(self._members)
+
+    def __eq__(self, other) -> bool:
+        return self.materialize() == other
+
+    def __repr__(self) -> str:
+        return repr(self.materialize())
+
+    def clear(self) -> None:
+        self._members = {}
+        self._pos, self._last, self._skipped = -1, -1, []
+
+    def copy(self) -> dict:
+        return self.materialize()
+
+    def materialize(self) -> dict:
+        """Return the object as a plain dict, parsing what is left to parse."""
+        self._scan()
+        text = self._source.text
+        return {key: _materialize(value, text) for key, value in self._members.items()}
+
+
+class LazyArray(MutableSequence):
+    """
+    A JSON array whose items are located on demand, and only parsed when
+    a path descends into them.
+    """
+
+    __slots__ = ("_source", "_items", "_pos", "_last")
+
+    def __init__(self, source: _Source, start: int) -> None:
+        self._source = source
+        self._items = []  # type: list
+        self._pos = _open(source, start, "]")
+        self._last = -1
+
+    def _scan(self, index: int = -1) -> None:
+        """Locate items up to `index`, or up to the end of the array."""
+        source, items, pos, last = self._source, self._items, self._pos, self._last
+        skeleton, item = source.skeleton, _patterns().item
+        try:
+            while pos != -1:
+                if 0 <= index < len(items):
+                    break
+                if last != -1:
+                    pos = _skip_separator(source, _skip(source, last), "]")
+                    last = -1
+                    continue
+
+                # The items before `index` are located in a single pass.
+                count = index - len(items) if index >= 0 else None
+                match = None
+                scanner = item.scanner(skeleton, pos)  # type: ignore
+                for match in islice(iter(scanner.match, None), count):
+                    items.append(_Pending(match.start(1)))
+                if match is not None:
+                    pos = match.end()
+                    if skeleton[pos] == "]":
+                        pos = -1
+                        break
+
+                last = pos
+                items.append(_Pending(last))
+        except IndexError:
+            raise _unexpected_end(source.text)
+        finally:
+            self._pos, self._last = pos, last
+
+    def _located(self) -> list:
+        self._scan()
+        return self._items
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            items = self._located()
+            return [self[position] for position in range(len(items))[index]]
+
+        items = self._items
+        if self._pos != -1:
+            self._scan(index)
+        value = items[index]
+        if isinstance(value, _Pending):
+            value = items[index] = _load(self._source, value.start)
+        return value
+
+    def __setitem__(self, index, value) -> None:
+        self._located()[index] = value
+
+    def __delitem__(self, index) -> None:
+        del self._located()[index]
+
+    def __len__(self) -> int:
+        return len(self._located())
+
+    def __eq__(self, other) -> bool:
+        return self.materialize() == other
+
+    def __repr__(self) -> str:
+        return repr(self.materialize())
+
+    def insert(self, index, value) -> None:
+        self._located().insert(index, value)
+
+    def materialize(self) -> list:
+        """Return the array as a plain list, parsing what is left to parse."""
+        text = self._source.text
+        return [_materialize(value, text) for value in self._located()]
+
+
+class LazyCut(Cut):
+    """
+    LazyCut operates on a raw JSON document without decoding it upfront.
+
+    Sibling values are skipped over when a path descends into a subtree,
+    and the containers met on the way are cached. Values returned by a
+    lookup are plain Python objects, stored back in place of their lazy
+    counterpart so that later lookups and writes go through them.
+
+    As with json.loads, the last duplicate of a member name wins; but the
+    members after the one a lookup needs are not scanned for duplicates,
+    and a value already read is kept.
+
+    ex:
+        proxy = LazyCut.from_json(response.content)
+        proxy['data.children[0].data.id']
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_json(cls, document: TDocument, sep: str = ".") -> "LazyCut":
+        if not isinstance(document, str):
+            document = str(document, "utf-8")
+        start = _WHITESPACE.match(document).end()  # type: ignore
+        return cls(_load(_Source(document), start), sep)
+
+    def __getitem__(self, path: str):
+        value = super().__getitem__(path)
+        if isinstance(value, (LazyObject, LazyArray)):
+            *keys, last_key = split_path(path, self.sep)
+            item = traverse(data=self.data, keys=keys, original_path=path)
+            value = item[last_key] = value.materialize()
+        return value
+
+    def materialize(self) -> dict:
+        """Return the whole document as plain Python objects."""
+        return _materialize(self.data, "")
@@ -0,0 +1,204 @@
+"""
+    Transformations of record streams, fused into a single pass per record.
+"""
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from .scalpl import LEAF, build_trie, delete_trie, split_path, vivify
+
+_MISSING = object()
+
+
+def _child(value, key):
+    try:
+        return value[key]
+    except (KeyError, IndexError, TypeError):
+        return _MISSING
+
+
+def _resolve_trie(data, trie: dict) -> Dict[str, Any]:
+    """Return the values found at the paths of a trie, by path."""
+    values = {}
+    stack = [(data, trie)]
+    while stack:
+        value, node = stack.pop()
+        for key, child in node.items():
+            if key is LEAF:
+                values[child] = value
+                continue
+            item = _child(value, key)
+            if item is not _MISSING:
+                stack.append((item, child))
+    return values
+
+
+def _merge_nodes(nodes: List[dict]) -> dict:
+    """Merge the trie nodes of the paths reaching the same item."""
+    merged = {}  # type: dict
+    for node in nodes:
+        for key, child in node.items():
+            if key is LEAF or key not in merged:
+                merged[key] = child
+            else:
+                merged[key] = _merge_nodes([merged[key], child])
+    return merged
+
+
+def _select_trie(value, node: dict):
+    """Copy the parts of `value` reached by the paths of a trie node."""
+    if LEAF in node:
+        return value
+
+    if isinstance(value, list):
+        size = len(value)
+        # Negative indexes are made positive, so that the items reached by
+        # several paths are only selected once, and in order.
+        by_index = {}  # type: Dict[int, List[dict]]
+        for key, child in node.items():
+            if isinstance(key, int) and -size <= key < size:
+                by_index.setdefault(key % size, []).append(child)
+        selected = [
+            _select_trie(value[index], _merge_nodes(by_index[index]))
+            for index in sorted(by_index)
+        ]
+        return [item for item in selected if item is not _MISSING] or _MISSING
+
+    if not isinstance(value, dict):
+        return _MISSING
+
+    copy = {}
+    for key, child in node.items():
+        item = _child(value, key)
+        if item is not _MISSING:
+            item = _select_trie(item, child)
+            if item is not _MISSING:
+                copy[key] = item
+    return copy or _MISSING
+
+
+class Pipeline:
+    """
+    Pipeline chains selections, filters and transformations of records.
+
+    Consecutive filters look up their paths in one traversal, as do
+    consecutive drops, and records flow lazily through all the stages one
+    at a time, without intermediate lists.
+
+    ex:
+        pipeline = (
+            Pipeline()
+            .where('data.score', lambda score: score > 10)
+            .set('data.ratio', lambda record: record['data']['ups'] / 100)
+            .drop(['data.selftext', 'data.media'])
+        )
+        for record in pipeline.run(records):
+            ...
+    """
+
+    __slots__ = ("sep", "_stages", "_compiled")
+
+    def __init__(self, sep: str = ".") -> None:
+        self.sep = sep
+        self._stages = []  # type: List[tuple]
+        self._compiled = None  # type: Optional[List[Callable]]
+
+    def __call__(self, records: Iterable[dict]) -> Iterator[dict]:
+        return self.run(records)
+
+    def _add(self, *stage) -> "Pipeline":
+        self._stages.append(stage)
+        self._compiled = None
+        return self
+
+    def drop(self, paths: Iterable[str]) -> "Pipeline":
+        """Delete the given paths from each record, when they exist."""
+        return self._add("drop", list(paths))
+
+    def select(self, paths: Iterable[str]) -> "Pipeline":
+        """Replace each record by a copy holding only the given paths."""
+        return self._add("select", list(paths))
+
+    def set(self, path: str, function: Callable[[dict], Any]) -> "Pipeline":
+        """
+        Set at `path` the result of `function` called with each record,
+        creating the dicts and lists missing on the way.
+        """
+        return self._add("set", path, function)
+
+    def where(self, path: str, predicate: Callable[[Any], bool]) -> "Pipeline":
+        """Only keep the records holding a value at `path` matching `predicate`."""
+        return self._add("where", path, predicate)
+
+    def _compile(self) -> List[Callable]:
+        """
+        Turn the stages into functions taking a record and returning it, or
+        _MISSING to discard it, merging consecutive filters and drops.
+        """
+        if self._compiled is not None:
+            return self._compiled
+
+        groups = []  # type: List[List[tuple]]
+        for stage in self._stages:
+            kind = stage[0]
+            if groups and kind in ("where", "drop") and groups[-1][0][0] == kind:
+                groups[-1].append(stage)
+            else:
+                groups.append([stage])
+
+        self._compiled = [getattr(self, f"_{group[0][0]}")(group) for group in groups]
+        return self._compiled
+
+    def _drop(self, stages: List[tuple]) -> Callable:
+        trie = build_trie([path for stage in stages for path in stage[1]], self.sep)
+
+        def drop(record):
+            delete_trie(record, trie)
+            return record
+
+        return drop
+
+    def _select(self, stages: List[tuple]) -> Callable:
+        trie = build_trie(stages[0][1], self.sep)
+
+        def select(record):
+            selected = _select_trie(record, trie)
+            return {} if selected is _MISSING else selected
+
+        return select
+
+    def _set(self, stages: List[tuple]) -> Callable:
+        _, path, function = stages[0]
+        keys = split_path(path, self.sep)
+        last_key = keys[-1]
+
+        def assign(record):
+            vivify(record, keys, path)[last_key] = function(record)
+            return record
+
+        return assign
+
+    def _where(self, stages: List[tuple]) -> Callable:
+        trie = build_trie([stage[1] for stage in stages], self.sep)
+        predicates = [(stage[1], stage[2]) for stage in stages]
+
+        def where(record):
+            values = _resolve_trie(record, trie)
+            for path, predicate in predicates:
+                if path not in values or not predicate(values[path]):
+                    return _MISSING
+            return record
+
+        return where
+
+    def run(self, records: Iterable[dict]) -> Iterator[dict]:
+        """
+        Lazily yield the records going through every stage. Records are
+        modified in place by `set` and `drop`, unless a `select` precedes.
+        """
+        stages = self._compile()
+        for record in records:
+            for stage in stages:
+                record = stage(record)
+                if record is _MISSING:
+                    break
+            else:
+                yield record
@@ -0,0 +1,259 @@
+"""
+    Query expressions: paths extended with wildcards and filters.
+
+    ex:
+        'data.children[?data.score>10].data.id'
+        'data.children[*].data.tags[0]'
+"""
+from collections.abc import Mapping, Sequence
+from functools import lru_cache
+import json
+import operator
+import re
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+TStep = Callable[[Iterator], Iterator]
+
+_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">=": operator.ge,
+    "<=": operator.le,
+    ">": operator.gt,
+    "<": operator.lt,
+}
+_FILTER = re.compile(r"(?P<path>[^=!<>]+?)\s*(?P<op>==|!=|>=|<=|>|<)\s*(?P<value>.+)")
+_MISSING = object()
+
+
+def _split_sections(expression: str, sep: str) -> List[str]:
+    """Split on the separators which are neither in brackets nor in quotes."""
+    sections = []
+    start = depth = 0
+    quote = ""
+    position = 0
+    while position < len(expression):
+        char = expression[position]
+        if quote:
+            if char == "\\":
+                position += 1
+            elif char == quote:
+                quote = ""
+        elif char in "\"'" and depth:
+            quote = char
+        elif char == "[":
+            depth += 1
+        elif char == "]":
+            depth -= 1
+        elif not depth and expression.startswith(sep, position):
+            sections.append(expression[start:position])
+            start = position + len(sep)
+            position = start
+            continue
+        position += 1
+
+    sections.append(expression[start:])
+    return sections
+
+
+def _split_brackets(section: str) -> Tuple[str, List[str]]:
+    """Split a section into its key and the contents of its brackets."""
+    key, bracket, rest = section.partition("[")
+    rest = bracket + rest
+    contents = []
+    position = start = depth = 0
+    quote = ""
+    while position < len(rest):
+        char = rest[position]
+        if quote:
+            if char == "\\":
+                position += 1
+            elif char == quote:
+                quote = ""
+        elif char in "\"'" and depth:
+            quote = char
+        elif char == "[":
+            if not depth:
+                start = position + 1
+            depth += 1
+        elif char == "]" and depth:
+            depth -= 1
+            if not depth:
+                contents.append(rest[start:position])
+        elif not depth:
+            raise ValueError(f"Key '{section}' is badly formated.")
+        position += 1
+
+    if depth or "" in contents:
+        raise ValueError(f"Key '{section}' is badly formated.")
+    return key, contents
+
+
+def _parse_literal(text: str):
+    try:
+        return json.loads(text)
+    except ValueError:
+        if text[:1] == "'" and text[-1:] == "'":
+            return text[1:-1]
+        return text
+
+
+def _parse(expression: str, sep: str) -> list:
+    """Parse an expression into ('key', k), ('each',) and ('filter', ...) steps."""
+    steps = []  # type: list
+    for section in _split_sections(expression, sep):
+        key, contents = _split_brackets(section)
+        if key or not contents:
+            steps.append(("key", key))
+
+        for content in contents:
+            if content == "*":
+                steps.append(("each",))
+            elif content.startswith("?"):
+                steps.append(_parse_filter(content[1:], section, sep))
+            else:
+                try:
+                    steps.append(("key", int(content)))
+                except ValueError:
+                    raise ValueError(
+                        f"Unable to access item '{content}' in key '{section}': "
+                        "you can only provide integers, '*' or filters to access list items."
+                    )
+    return steps
+
+
+def _parse_filter(condition: str, section: str, sep: str) -> tuple:
+    if not condition.strip():
+        raise ValueError(f"Key '{section}' is badly formated.")
+    match = _FILTER.fullmatch(condition.strip())
+    if match is None:
+        path, test = condition.strip(), None  # type: str, Optional[Callable]
+    else:
+        path = match.group("path")
+        compare = _OPERATORS[match.group("op")]
+        expected = _parse_literal(match.group("value").strip())
+        test = lambda value: compare(value, expected)
+
+    keys = []
+    for step in _parse(path, sep):
+        if step[0] != "key":
+            raise ValueError(
+                f"Unable to filter items in key '{section}': "
+                "a filter can only test a path made of keys and indexes."
+            )
+        keys.append(step[1])
+    return ("filter", tuple(keys), test)
+
+
+def _children(value) -> Iterable:
+    if isinstance(value, dict):
+        return value.values()
+    if isinstance(value, (list, tuple)):
+        return value
+    if isinstance(value, (str, int, float)) or value is None:
+        return ()
+    if isinstance(value, Mapping):
+        return value.values()
+    if isinstance(value, Sequence):
+        return value
+    return ()
+
+
+def _resolve(value, keys: tuple):
+    try:
+        for key in keys:
+            value = value[key]
+    except (KeyError, IndexError, TypeError):
+        return _MISSING
+    return value
+
+
+def _lookup(keys: tuple) -> TStep:
+    def step(values: Iterator) -> Iterator:
+        for value in values:
+            value = _resolve(value, keys)
+            if value is not _MISSING:
+                yield value
+
+    return step
+
+
+def _each(values: Iterator) -> Iterator:
+    for value in values:
+        yield from _children(value)
+
+
+def _filter(keys: tuple, test: Optional[Callable]) -> TStep:
+    def step(values: Iterator) -> Iterator:
+        for value in values:
+            for item in _children(value):
+                target = _resolve(item, keys)
+                if target is _MISSING:
+                    continue
+                if test is None:
+                    yield item
+                    continue
+                try:
+                    matches = test(target)
+                except TypeError:
+                    continue
+                if matches:
+                    yield item
+
+    return step
+
+
+def _plan(steps: list) -> List[TStep]:
+    """
+    Turn parsed steps into generator steps: consecutive keys are looked up
+    in one go, and filters are evaluated while iterating over the items
+    they test, so that no intermediate list is ever built.
+    """
+    plan = []  # type: List[TStep]
+    keys = []  # type: List[Union[str, int]]
+    for step in steps:
+        if step[0] == "key":
+            keys.append(step[1])
+            continue
+        if keys:
+            plan.append(_lookup(tuple(keys)))
+            keys = []
+        if step[0] == "each":
+            plan.append(_each)
+        else:
+            plan.append(_filter(step[1], step[2]))
+
+    if keys:
+        plan.append(_lookup(tuple(keys)))
+    return plan
+
+
+class Query:
+    """
+    A compiled query expression.
+
+    ex:
+        query = compile_query('data.children[?data.score>10].data.id')
+        ids = list(query.evaluate(document))
+    """
+
+    __slots__ = ("expression", "_plan")
+
+    def __init__(self, expression: str, sep: str = ".") -> None:
+        self.expression = expression
+        self._plan = _plan(_parse(expression, sep))
+
+    def __repr__(self) -> str:
+        return f"Query: {self.expression}"
+
+    def evaluate(self, data) -> Iterator:
+        """Lazily yield every value matched by the query."""
+        values = iter((data,))  # type: Iterator
+        for step in self._plan:
+            values = step(values)
+        return values
+
+
+@lru_cache(maxsize=256)
+def compile_query(expression: str, sep: str = ".") -> Query:
+    return Query(expression, sep)
@@ -0,0 +1,91 @@
+"""
+    Sort, group and rank lists of records by the value at a path.
+"""
+import heapq
+from typing import Any, Callable, Dict, Hashable, Iterable, List
+
+from .scalpl import split_path, traverse
+
+_MISSING = object()
+
+
+def _key_function(path: str, default, sep: str) -> Callable[[Any], Any]:
+    """
+    Return a function reading the value at `path` in a record, or `default`
+    when the path is missing, with the path split once and for all.
+    """
+    keys = split_path(path, sep)
+
+    if default is _MISSING:
+        return lambda record: traverse(data=record, keys=keys, original_path=path)
+
+    def key(record):
+        try:
+            return traverse(data=record, keys=keys, original_path=path)
+        except (KeyError, IndexError):
+            return default
+
+    return key
+
+
+def sort_by(
+    records: Iterable,
+    path: str,
+    reverse: bool = False,
+    default=_MISSING,
+    sep: str = ".",
+) -> list:
+    """
+    Return the records sorted by the value at `path`, which is `default`
+    for the records missing it. Records with equal values keep their order.
+
+    ex:
+        sort_by(data['pokemon'], 'moves.Tackle.power', reverse=True, default=0)
+    """
+    records = list(records)
+    # Values are read once each, and only them are compared by sorting
+    # the positions of the records.
+    values = list(map(_key_function(path, default, sep), records))
+    positions = sorted(range(len(records)), key=values.__getitem__, reverse=reverse)
+    return [records[position] for position in positions]
+
+
+def group_by(
+    records: Iterable, path: str, default=_MISSING, sep: str = "."
+) -> Dict[Hashable, List]:
+    """
+    Group the records by the value at `path`, which is `default` for the
+    records missing it, in the order of their first occurrence.
+
+    ex:
+        group_by(data['pokemon'], 'type')
+        # {'Grass': [...], 'Water': [...]}
+    """
+    key = _key_function(path, default, sep)
+    groups = {}  # type: Dict[Hashable, List]
+    for record in records:
+        value = key(record)
+        try:
+            groups[value].append(record)
+        except KeyError:
+            groups[value] = [record]
+    return groups
+
+
+def top_k(
+    records: Iterable,
+    path: str,
+    k: int,
+    default=_MISSING,
+    largest: bool = True,
+    sep: str = ".",
+) -> list:
+    """
+    Return the `k` records with the largest values at `path`, or the
+    smallest ones, from the first; without sorting them all.
+
+    ex:
+        top_k(data['pokemon'], 'level', 3, default=0)
+    """
+    select = heapq.nlargest if largest else heapq.nsmallest
+    return select(k, records, key=_key_function(path, default, sep))
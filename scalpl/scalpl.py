@@ -1,22 +1,45 @@
 """
     A lightweight wrapper to operate on nested dictionaries seamlessly.
 """
+from abc import ABC, abstractmethod
+from collections.abc import Mapping, MutableMapping, MutableSequence
+from contextlib import contextmanager
+from copy import deepcopy
+from functools import partial
+from hashlib import blake2b
+import heapq
 from itertools import chain
+import json
+from operator import itemgetter
+import sys
 from typing import (
+    Any,
+    Callable,
+    Dict,
     ItemsView,
     Iterable,
     Iterator,
     KeysView,
     List,
     Optional,
+    Sequence,
+    Tuple,
     Type,
     TypeVar,
     Union,
     ValuesView,
 )
+from weakref import WeakValueDictionary
+
+from .adapters import adapter_for, delete_item, get_item, set_item
+from .interner import Interner
+from .query import compile_query
 
 TCut = TypeVar("TCut", bound="Cut")
 TKeyList = List[Union[str, int]]
+TChange = Tuple[str, Tuple[Union[str, int], ...], Any]
+
+_MISSING = object()
 
 
 def key_error(failing_key, original_path, raised_error):
@@ -66,6 +89,52 @@ def split_path(path: str, key_separator: str) -> TKeyList:
     return result
 
 
+def join_path(keys: Iterable[Union[str, int]], key_separator: str) -> str:
+    """Build the path leading to `keys`, the reverse of split_path."""
+    parts = []  # type: List[str]
+    for key in keys:
+        if isinstance(key, int):
+            parts.append(f"[{key}]")
+        elif parts:
+            parts.append(f"{key_separator}{key}")
+        else:
+            parts.append(f"{key}")
+    return "".join(parts)
+
+
+def unchain(links: Optional[tuple]) -> TKeyList:
+    """Return the keys of nested (parent links, key) pairs, from the root."""
+    keys = []  # type: TKeyList
+    while links is not None:
+        links, key = links
+        keys.append(key)
+    keys.reverse()
+    return keys
+
+
+CONTAINERS = (dict, list, Mapping, MutableSequence)
+SEQUENCES = (list, MutableSequence)
+
+
+def child_items(value) -> Optional[list]:
+    """
+    Return the (key, child) pairs of a container, or None for other values.
+    Containers are dicts and lists, and any mapping or mutable sequence, like
+    the lazy objects and arrays of a LazyCut.
+    """
+    if isinstance(value, dict):
+        return list(value.items())
+    if isinstance(value, list):
+        return list(enumerate(value))
+    if isinstance(value, (str, int, float)) or value is None:
+        return None
+    if isinstance(value, Mapping):
+        return list(value.items())
+    if isinstance(value, MutableSequence):
+        return list(enumerate(value))
+    return None
+
+
 def traverse(data: dict, keys: List[Union[str, int]], original_path: str):
     value = data
     try:
@@ -76,11 +145,812 @@ def traverse(data: dict, keys: List[Union[str, int]], original_path: str):
     except IndexError as error:
         raise index_error(key, original_path, error)
     except TypeError:
-        raise type_error(key, original_path, value)
+        if adapter_for(type(value)) is None:
+            raise type_error(key, original_path, value)
+        # Dicts and lists stay on the fast path above, and only the graphs
+        # holding other containers are traversed again through adapters.
+        return traverse_adapted(data, keys, original_path)
+
+    return value
 
+
+def traverse_adapted(data, keys: TKeyList, original_path: str):
+    """Like traverse, but operate on any container having an adapter."""
+    value = data
+    for key in keys:
+        try:
+            value = get_item(value, key)
+        except KeyError as error:
+            raise key_error(key, original_path, error)
+        except IndexError as error:
+            raise index_error(key, original_path, error)
+        except TypeError:
+            raise type_error(key, original_path, value)
     return value
 
 
+def grow(items: list, index: int, original_path: str) -> None:
+    """Extend a list with None, in one allocation, so that `index` exists."""
+    if index < 0:
+        if -index > len(items):
+            raise index_error(
+                index, original_path, IndexError("list index out of range")
+            )
+    elif index >= len(items):
+        items.extend([None] * (index + 1 - len(items)))
+
+
+def reject_negative_indexes(keys: TKeyList, original_path: str) -> None:
+    """Raise for the first negative index, which cannot exist in a new list."""
+    for key in keys:
+        if isinstance(key, int) and key < 0:
+            raise index_error(key, original_path, IndexError("list index out of range"))
+
+
+def vivify(data: dict, keys: TKeyList, original_path: str):
+    """
+    Like traverse, but create the containers missing on the way: a dict
+    when the key that follows is a string, a list when it is an index.
+    Lists are extended up to the index to reach, and so is the returned
+    container when the last key is an index.
+    """
+    item = data  # type: Any
+    steps = zip(keys, keys[1:])  # type: Iterator[Tuple[Any, Any]]
+    for position, (key, next_key) in enumerate(steps):
+        try:
+            value = item[key]
+        except KeyError:
+            value = None
+        except IndexError:
+            # Nothing is created when the rest of the path cannot be.
+            reject_negative_indexes(keys[position + 1 :], original_path)
+            grow(item, key, original_path)
+            value = None
+        except TypeError:
+            adapter = adapter_for(type(item))
+            if adapter is None:
+                raise type_error(key, original_path, item)
+            try:
+                value = adapter.get(item, key)
+            except KeyError:
+                value = None
+            except TypeError:
+                raise type_error(key, original_path, item)
+
+        if value is None:
+            reject_negative_indexes(keys[position + 1 :], original_path)
+            value = {} if isinstance(next_key, str) else []
+            set_item(item, key, value)
+        item = value
+
+    last_key = keys[-1]
+    if isinstance(last_key, int) and isinstance(item, list):
+        grow(item, last_key, original_path)
+    return item
+
+
+LEAF = object()
+
+
+def build_trie(paths: Iterable[str], key_separator: str) -> dict:
+    """
+    Merge paths into a trie of nested dicts keyed by path keys, so that their
+    common prefixes can be traversed once. A node where a path ends holds this
+    path under the `LEAF` key.
+    """
+    trie = {}  # type: dict
+    for path in paths:
+        node = trie
+        for key in split_path(path, key_separator):
+            node = node.setdefault(key, {})
+        node[LEAF] = path
+    return trie
+
+
+def trie_path(node: dict) -> str:
+    """Return one of the paths going through a trie node."""
+    while LEAF not in node:
+        node = next(iter(node.values()))
+    return node[LEAF]
+
+
+def _sort_indexes(children: list, size: int) -> list:
+    """
+    Order the (index, trie node) pairs of a list by increasing index, once
+    negative indexes are made positive. When an index is both deleted and
+    traversed, only its deletion is kept.
+    """
+    by_index = {}  # type: dict
+    for key, child in children:
+        if isinstance(key, int) and -size <= key < 0:
+            key += size
+        by_index.setdefault(key, []).append(child)
+
+    ordered = []  # type: list
+    for key in sorted(by_index, key=lambda key: (not isinstance(key, int), key)):
+        nodes = by_index[key]
+        leaves = [node for node in nodes if LEAF in node]
+        ordered.extend((key, node) for node in leaves[:1] or nodes)
+    return ordered
+
+
+def delete_trie(
+    data: dict,
+    trie: dict,
+    missing_ok: bool = True,
+    changing: Optional[Callable[[TKeyList], None]] = None,
+) -> List[TKeyList]:
+    """
+    Delete the paths of a trie built by build_trie, and return the keys of
+    the deleted items. The items of a list are deleted from the last to the
+    first, so that the indexes of the paths do not shift.
+
+    `changing` is called with the keys of each item right before its deletion.
+    """
+    deleted = []
+    # Tasks are (container, key, trie node, parent keys), and lists get
+    # their items visited from the last one, before any lower sibling.
+    stack = [(None, None, trie, [])]  # type: list
+    while stack:
+        container, key, node, prefix = stack.pop()
+        if container is None:
+            item = data
+        else:
+            try:
+                item = container[key]
+            except KeyError as error:
+                if missing_ok:
+                    continue
+                raise key_error(key, trie_path(node), error)
+            except IndexError as error:
+                if missing_ok:
+                    continue
+                raise index_error(key, trie_path(node), error)
+            except TypeError:
+                raise type_error(key, trie_path(node), container)
+
+            if LEAF in node:
+                if changing is not None:
+                    changing([*prefix, key])
+                del container[key]
+                deleted.append([*prefix, key])
+                continue
+            prefix = [*prefix, key]
+
+        children = [(key, child) for key, child in node.items() if key is not LEAF]
+        if isinstance(item, list):
+            children = _sort_indexes(children, len(item))
+        for key, child in children:
+            stack.append((item, key, child, prefix))
+
+    return deleted
+
+
+def overlaps(op: str, changed: Sequence, watched: Sequence) -> bool:
+    """
+    Tell whether writing at the `changed` keys may alter the value found
+    at the `watched` keys, which happens when one leads to the other.
+    """
+    if op == "delete" and changed and isinstance(changed[-1], int):
+        # Removing a list item shifts all the items that follow it.
+        changed = changed[:-1]
+
+    for changed_key, watched_key in zip(changed, watched):
+        if changed_key == watched_key:
+            continue
+        if (
+            isinstance(changed_key, int)
+            and isinstance(watched_key, int)
+            and (changed_key < 0 or watched_key < 0)
+        ):
+            continue
+        return False
+    return True
+
+
+class Observer:
+    """Base class of the objects notified of the writes made through a Cut."""
+
+    __slots__ = ()
+
+    def changing(self, op: str, keys: TKeyList) -> None:
+        """
+        Called right before a write at `keys`, which may still fail, with
+        the same op as `changed`.
+        """
+
+    def changed(self, op: str, keys: TKeyList, value) -> None:
+        """
+        Called once `value` has been set at `keys` (op is 'set'), or once
+        the item at `keys` has been removed (op is 'delete' or 'clear').
+        """
+
+
+class ListIndex(Mapping, Observer):
+    """
+    A hash index from the values found at a key path in each item of a list
+    to the position of the first item holding them.
+
+    It is rebuilt on the next lookup after the list has been modified through
+    the Cut that created it; changes made by other means require a call to
+    `refresh`.
+    """
+
+    __slots__ = ("cut", "path", "key", "_list_keys", "_item_keys", "_positions")
+
+    def __init__(self, cut: "Cut", path: str, key: str) -> None:
+        self.cut = cut
+        self.path = path
+        self.key = key
+        self._list_keys = split_path(path, cut.sep)
+        self._item_keys = split_path(key, cut.sep)
+        self._positions = None  # type: Optional[dict]
+
+    def __getitem__(self, value):
+        return self._list()[self.position(value)]
+
+    def __iter__(self) -> Iterator:
+        return iter(self._index())
+
+    def __len__(self) -> int:
+        return len(self._index())
+
+    def __repr__(self) -> str:
+        return f"ListIndex: {self.path} by {self.key}"
+
+    def _list(self):
+        items = traverse(self.cut.data, self._list_keys, self.path)
+        if not isinstance(items, (list, tuple)):
+            raise TypeError(
+                f"Cannot index '{self.path}': "
+                f"the element must be a list but is of type '{type(items)}'."
+            )
+        return items
+
+    def _index(self) -> dict:
+        if self._positions is None:
+            self.refresh()
+        return self._positions  # type: ignore
+
+    def changed(self, op: str, keys: TKeyList, value) -> None:
+        if self._positions is not None and overlaps(op, keys, self._list_keys):
+            self._positions = None
+
+    def position(self, value) -> int:
+        """Return the position of the first item holding `value`."""
+        return self._index()[value]
+
+    def refresh(self) -> None:
+        """Rebuild the index from the current content of the list."""
+        positions = {}  # type: dict
+        item_keys = self._item_keys
+        for position, item in enumerate(self._list()):
+            try:
+                for key in item_keys:
+                    item = item[key]
+            except (KeyError, IndexError, TypeError):
+                continue
+            positions.setdefault(item, position)
+        self._positions = positions
+
+
+class Journal(Observer):
+    """
+    Record the writes made through a Cut as (op, keys, value) changes, with
+    a copy of the values set and indexes counted from the start of lists,
+    so that replaying them in order reproduces the writes.
+
+    A write replaces the changes recorded at and under its keys, but a
+    deletion keeps those under it, which may have created its parents.
+    Deleting a list item shifts the following ones: the changes recorded
+    before are then kept apart, to be replayed first.
+    """
+
+    __slots__ = ("cut", "_sealed", "_changes", "_tree")
+
+    def __init__(self, cut: "Cut") -> None:
+        self.cut = cut
+        self._sealed = []  # type: List[TChange]
+        self._changes = {}  # type: Dict[tuple, TChange]
+        # The keys of the changes not kept apart, in a trie as built by
+        # build_trie.
+        self._tree = {}  # type: dict
+
+    def _seal(self) -> None:
+        self._sealed.extend(self._changes.values())
+        self._changes, self._tree = {}, {}
+
+    def _positive(self, op: str, path: tuple) -> tuple:
+        """Count the negative indexes of a path from the start of their list."""
+        keys = list(path)
+        item = self.cut.data
+        for depth, key in enumerate(keys):
+            if isinstance(key, int) and key < 0 and isinstance(item, SEQUENCES):
+                size = len(item)
+                if op == "delete" and depth == len(keys) - 1:
+                    # The item is already deleted.
+                    size += 1
+                keys[depth] = key = key + size
+            if depth < len(keys) - 1:
+                item = get_item(item, key)
+        return tuple(keys)
+
+    def changed(self, op: str, keys: TKeyList, value) -> None:
+        path = tuple(keys)
+        if any(isinstance(key, int) and key < 0 for key in path):
+            path = self._positive(op, path)
+        if not isinstance(value, (str, int, float, type(None))):
+            value = deepcopy(value)
+        change = (op, path, value)
+        if op == "clear":
+            self._sealed, self._changes, self._tree = [change], {}, {}
+            return
+
+        if op == "delete" and isinstance(path[-1], int):
+            self._seal()
+            self._sealed.append(change)
+            return
+        if op == "delete" and path in self._changes:
+            self._seal()
+
+        node = self._tree
+        for key in path:
+            node = node.setdefault(key, {})
+        if op == "set":
+            stack = [node]
+            while stack:
+                for key, child in stack.pop().items():
+                    if key is LEAF:
+                        del self._changes[child]
+                    else:
+                        stack.append(child)
+            node.clear()
+        node[LEAF] = path
+        self._changes[path] = change
+
+    def drain(self) -> List[TChange]:
+        """Return the recorded changes in order, and forget them."""
+        changes = [*self._sealed, *self._changes.values()]
+        self._sealed, self._changes, self._tree = [], {}, {}
+        return changes
+
+
+class ComputedPaths(Observer):
+    """
+    The derived values of a Cut, by path, cached until one of the paths they
+    depend on is written through the Cut.
+    """
+
+    __slots__ = ("cut", "_entries")
+
+    def __init__(self, cut: "Cut") -> None:
+        self.cut = cut
+        # [function, keys of the dependencies, cached value or _MISSING]
+        self._entries = {}  # type: Dict[str, list]
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._entries
+
+    def add(self, path: str, function: Callable, depends_on: Iterable[str]) -> None:
+        sep = self.cut.sep
+        dependencies = [split_path(dependency, sep) for dependency in depends_on]
+        self._entries[path] = [function, dependencies, _MISSING]
+
+    def changed(self, op: str, keys: TKeyList, value) -> None:
+        for entry in self._entries.values():
+            if entry[2] is not _MISSING and any(
+                overlaps(op, keys, dependency) for dependency in entry[1]
+            ):
+                entry[2] = _MISSING
+
+    def get(self, path: str):
+        entry = self._entries[path]
+        if entry[2] is _MISSING:
+            entry[2] = entry[0](self.cut)
+        return entry[2]
+
+
+class UndoLog(Observer):
+    """
+    The prior state of the items written through a Cut, recorded right
+    before each write as (action, container, key, value, keys) entries, to
+    undo the writes in reverse order.
+
+    An entry only holds what a single write replaces, and undoing it is
+    harmless when the write it precedes has failed.
+    """
+
+    __slots__ = ("cut", "_entries")
+
+    def __init__(self, cut: "Cut") -> None:
+        self.cut = cut
+        self._entries = []  # type: List[tuple]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def changing(self, op: str, keys: TKeyList) -> None:
+        record = self._entries.append
+        container = self.cut.data
+        if op == "clear":
+            record(("restore", container, None, list(container.items()), []))
+            return
+
+        last = len(keys) - 1
+        for depth, key in enumerate(keys):
+            if isinstance(container, MutableSequence):
+                if not isinstance(key, int):
+                    return
+                size = len(container)
+                if key >= size:
+                    # Lists are extended with None up to the index to set.
+                    record(("truncate", container, size, None, keys[:depth]))
+                    return
+                if key < -size:
+                    return
+                key %= size
+                value = container[key]
+            elif isinstance(container, MutableMapping):
+                if key not in container:
+                    record(("remove", container, key, None, [*keys[:depth], key]))
+                    return
+                value = container[key]
+            else:
+                try:
+                    value = get_item(container, key)
+                except KeyError:
+                    record(("remove", container, key, None, [*keys[:depth], key]))
+                    return
+                except (IndexError, TypeError):
+                    return
+
+            if depth == last or value is None:
+                # None is replaced by a container when missing ones are created.
+                if op == "delete" and isinstance(container, MutableSequence):
+                    action = "insert"
+                elif op == "delete" and isinstance(container, MutableMapping):
+                    # A key set again goes last: the keys that followed it
+                    # are moved after it, to restore the order of the items.
+                    following = list(container)
+                    following = following[following.index(key) + 1 :]
+                    action, value = "reinsert", (value, following)
+                else:
+                    action = "set"
+                record((action, container, key, value, [*keys[:depth], key]))
+                return
+            container = value
+
+    def rollback(self, savepoint: int = 0) -> None:
+        """Undo the writes recorded since `savepoint`, and notify the Cut."""
+        entries = self._entries[savepoint:]
+        del self._entries[savepoint:]
+        notify = self.cut._changed
+        for action, container, key, value, keys in reversed(entries):
+            if action == "set":
+                try:
+                    set_item(container, key, value)
+                except (AttributeError, TypeError):
+                    # The write failed on a read-only container.
+                    continue
+                notify("set", keys, value)
+            elif action == "remove":
+                try:
+                    delete_item(container, key)
+                except (KeyError, AttributeError, TypeError):
+                    continue
+                notify("delete", keys)
+            elif action == "reinsert":
+                value, following = value
+                container[key] = value
+                for moved in following:
+                    if moved in container:
+                        container[moved] = container.pop(moved)
+                notify("set", keys, value)
+            elif action == "restore":
+                container.clear()
+                container.update(value)
+                notify("clear", [])
+                for item_key, item in value:
+                    notify("set", [item_key], item)
+            else:
+                # Items are shifted, so the whole list is notified as set.
+                if action == "insert":
+                    container.insert(key, value)
+                    keys = keys[:-1]
+                else:
+                    del container[key:]
+                notify("set", keys, container)
+
+
+class _CacheNode:
+    __slots__ = ("value", "children")
+
+    def __init__(self) -> None:
+        self.value = _MISSING
+        # None until the value has been invalidated once: the subtree is then
+        # computed again from the values cached for its children.
+        self.children = None  # type: Optional[Dict[Union[str, int], _CacheNode]]
+
+
+class PathCache(Observer, ABC):
+    """
+    A value computed from each subtree of the data of a Cut, cached in a
+    trie of paths. A write through the Cut only invalidates the values of
+    its ancestors, which are then computed again from those of their
+    untouched children.
+
+    A subtree never written to is computed at once by `leaf`, and a
+    container from the values of its children by `combine`.
+    """
+
+    __slots__ = ("cut", "_data", "_root")
+
+    def __init__(self, cut: "Cut") -> None:
+        self.cut = cut
+        self._data = cut.data
+        self._root = _CacheNode()
+
+    @abstractmethod
+    def leaf(self, value):
+        """Return the value computed from a whole subtree."""
+
+    @abstractmethod
+    def combine(self, container, results: List[Tuple[Any, Any]]):
+        """Return the value of a container from the (key, value) of its items."""
+
+    def changed(self, op: str, keys: TKeyList, value) -> None:
+        if op == "delete" and keys and isinstance(keys[-1], int):
+            # Removing a list item shifts all the items that follow it.
+            keys = keys[:-1]
+        if not keys:
+            self._root = _CacheNode()
+            return
+
+        if self.cut.data is not self._data:
+            # The cache is dropped on the next lookup anyway.
+            return
+
+        # The nodes down to the written value are all created, so that only
+        # they are computed again, and the siblings met on the way once, as
+        # leaves.
+        node, item = self._root, self._data
+        for depth, key in enumerate(keys):
+            if isinstance(key, int) and key < 0 and isinstance(item, SEQUENCES):
+                key += len(item)
+            node.value = _MISSING
+            if node.children is None:
+                node.children = {}
+            if depth == len(keys) - 1:
+                node.children.pop(key, None)
+                break
+            item = get_item(item, key)
+            node = node.children.setdefault(key, _CacheNode())
+
+    def get(self, keys: Optional[TKeyList] = None):
+        """Return the value computed for the subtree at `keys`."""
+        if self.cut.data is not self._data:
+            self._data, self._root = self.cut.data, _CacheNode()
+
+        value, node = self._data, self._root
+        for key in keys or ():
+            if node.children is None:
+                node.children = {}
+            if isinstance(key, int) and key < 0 and isinstance(value, SEQUENCES):
+                key += len(value)
+            value = value[key]
+            node = node.children.setdefault(key, _CacheNode())
+        return self._compute(value, node)
+
+    def _compute(self, value, node: _CacheNode):
+        if node.value is not _MISSING:
+            return node.value
+
+        children = node.children
+        items = None if children is None else child_items(value)
+        if children is not None and items is not None:
+            results = []
+            for key, item in items:
+                child = children.get(key)
+                if child is None:
+                    child = children[key] = _CacheNode()
+                results.append((key, self._compute(item, child)))
+            result = self.combine(value, results)
+        else:
+            node.children = None
+            result = self.leaf(value)
+
+        node.value = result
+        return result
+
+
+def _plain(value):
+    """Convert the mappings and sequences json does not know of, like lazy nodes."""
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, MutableSequence):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+_JSON_ENCODER = json.JSONEncoder(separators=(",", ":"), default=_plain)
+_encode_string = json.encoder.encode_basestring_ascii  # type: ignore
+
+
+class JsonFragments(PathCache):
+    """The compact JSON encoding of each subtree of a Cut, as bytes."""
+
+    __slots__ = ()
+
+    def leaf(self, value) -> bytes:
+        return _JSON_ENCODER.encode(value).encode()
+
+    def combine(self, container, results: List[Tuple[Any, bytes]]) -> bytes:
+        if isinstance(container, SEQUENCES):
+            return b"[" + b",".join(fragment for _, fragment in results) + b"]"
+        if not all(isinstance(key, str) for key, _ in results):
+            # Other keys are converted to strings the way json does it.
+            return self.leaf(container)
+        members = [
+            _encode_string(key).encode() + b":" + fragment for key, fragment in results
+        ]
+        return b"{" + b",".join(members) + b"}"
+
+
+def _digest(*parts: bytes) -> bytes:
+    return blake2b(b"".join(parts), digest_size=16).digest()
+
+
+class Fingerprints(PathCache):
+    """
+    The Merkle hash of each subtree of a Cut: equal subtrees get equal
+    hashes, whatever the order of their dict keys, and numbers that compare
+    equal, like 1 and 1.0, are hashed alike.
+    """
+
+    __slots__ = ()
+
+    def leaf(self, value) -> bytes:
+        items = child_items(value)
+        if items is not None:
+            return self.combine(value, [(k, self.leaf(v)) for k, v in items])
+        if isinstance(value, tuple):
+            return _digest(b"t", *map(self.leaf, value))
+        if value is None:
+            return _digest(b"n")
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if isinstance(value, int):
+            return _digest(b"i%d" % value)
+        if isinstance(value, float):
+            return _digest(b"f", value.hex().encode())
+        if isinstance(value, str):
+            return _digest(b"s", value.encode("utf-8", "surrogatepass"))
+        if isinstance(value, bytes):
+            return _digest(b"b", value)
+        return _digest(b"r", type(value).__name__.encode(), repr(value).encode())
+
+    def combine(self, container, results: List[Tuple[Any, bytes]]) -> bytes:
+        if isinstance(container, SEQUENCES):
+            return _digest(b"l", *(digest for _, digest in results))
+        # Members are sorted by hash, so that key order does not matter.
+        members = sorted(self.leaf(key) + digest for key, digest in results)
+        return _digest(b"d", *members)
+
+
+class _Subscribers:
+    __slots__ = ("children", "callbacks")
+
+    def __init__(self) -> None:
+        self.children = {}  # type: Dict[Union[str, int], _Subscribers]
+        self.callbacks = []  # type: List[Tuple[Callable, bool]]
+
+
+class Subscriptions(Observer):
+    """
+    The callbacks subscribed to paths of a Cut, kept in a prefix trie so that
+    a write only visits the subscribers along its own path, and those of the
+    subtree it replaces.
+
+    Batched callbacks are called with a list of (op, path, value) changes,
+    once for all the writes of an update.
+
+    A list index is also matched by the one counting the same item from the
+    other end of the list, as `a[-1]` and `a[2]` in a list of three items.
+    """
+
+    __slots__ = ("cut", "sep", "_root", "_pending")
+
+    def __init__(self, cut: "Cut") -> None:
+        self.cut = cut
+        self.sep = cut.sep
+        self._root = _Subscribers()
+        self._pending = None  # type: Optional[List[Tuple[Callable, list]]]
+
+    def add(self, path: str, callback: Callable, batch: bool) -> Callable[[], None]:
+        node = self._root
+        # The empty path subscribes to the whole document.
+        for key in split_path(path, self.sep) if path else ():
+            node = node.children.setdefault(key, _Subscribers())
+        subscription = (callback, batch)
+        node.callbacks.append(subscription)
+
+        def unsubscribe() -> None:
+            if subscription in node.callbacks:
+                node.callbacks.remove(subscription)
+
+        return unsubscribe
+
+    def changed(self, op: str, keys: TKeyList, value) -> None:
+        scope = keys
+        if op == "delete" and keys and isinstance(keys[-1], int):
+            # Removing a list item shifts all the items that follow it.
+            scope = keys[:-1]
+
+        subscriptions = list(self._root.callbacks)
+        nodes = [self._root]
+        item = self.cut.data
+        for depth, key in enumerate(scope):
+            aliases = (key,)  # type: tuple
+            if isinstance(key, int) and isinstance(item, SEQUENCES):
+                # The items of the scope are all still there.
+                size = len(item)
+                aliases = (key % size, key % size - size) if size else ()
+            nodes = [
+                node.children[alias]
+                for node in nodes
+                for alias in aliases
+                if alias in node.children
+            ]
+            if not nodes:
+                break
+            for node in nodes:
+                subscriptions.extend(node.callbacks)
+            if depth < len(scope) - 1:
+                item = get_item(item, key)
+        else:
+            stack = [child for node in nodes for child in node.children.values()]
+            while stack:
+                node = stack.pop()
+                subscriptions.extend(node.callbacks)
+                stack.extend(node.children.values())
+
+        if not subscriptions:
+            return
+
+        change = (op, join_path(keys, self.sep), value)
+        # Callbacks are compared by equality, as bound methods are created
+        # anew each time they are looked up.
+        notified = []  # type: List[Callable]
+        for callback, batch in subscriptions:
+            if callback in notified:
+                continue
+            notified.append(callback)
+            if not batch:
+                callback(*change)
+            elif self._pending is None:
+                callback([change])
+            else:
+                for held, changes in self._pending:
+                    if held == callback:
+                        changes.append(change)
+                        break
+                else:
+                    self._pending.append((callback, [change]))
+
+    def hold(self) -> bool:
+        """Start holding batched notifications, unless already holding them."""
+        if self._pending is not None:
+            return False
+        self._pending = []
+        return True
+
+    def release(self) -> None:
+        """Notify batched callbacks of the changes held since `hold`."""
+        pending, self._pending = self._pending, None
+        for callback, changes in pending or ():
+            callback(changes)
+
+
 class Cut:
     """
     Cut is a simple wrapper over the built-in dict class.
@@ -93,16 +963,24 @@ class Cut:
         proxy = Cut(query)
         proxy['pokemon[0].level']
         proxy['pokemon[0].level'] = 666
+
+    With `autovivify`, setting a value creates the dicts and lists missing
+    on its path.
     """
 
-    __slots__ = ("data", "sep")
+    __slots__ = ("data", "sep", "autovivify", "_observers", "_computed")
 
-    def __init__(self, data: Optional[dict] = None, sep: str = ".") -> None:
+    def __init__(
+        self, data: Optional[dict] = None, sep: str = ".", autovivify: bool = False
+    ) -> None:
         if data is None:
             self.data = {}
         else:
             self.data = data
         self.sep = sep
+        self.autovivify = autovivify
+        self._observers = ()  # type: Sequence[Observer]
+        self._computed = None  # type: Optional[ComputedPaths]
 
     def __bool__(self) -> bool:
         return bool(self.data)
@@ -120,10 +998,17 @@ class Cut:
             return True
         except (KeyError, IndexError):
             return False
+        except TypeError:
+            adapter = adapter_for(type(item))
+            if adapter is None:
+                raise
+            return adapter.contains(item, last_key)
 
     def __delitem__(self, path: str) -> None:
         *keys, last_key = split_path(path, self.sep)
         item = traverse(data=self.data, keys=keys, original_path=path)
+        if self._observers:
+            self._changing("delete", [*keys, last_key])
 
         try:
             del item[last_key]
@@ -132,12 +1017,24 @@ class Cut:
         except IndexError as error:
             raise index_error(last_key, path, error)
         except TypeError:
-            raise type_error(last_key, path, item)
+            adapter = adapter_for(type(item))
+            if adapter is None:
+                raise type_error(last_key, path, item)
+            try:
+                adapter.delete(item, last_key)
+            except KeyError as error:
+                raise key_error(last_key, path, error)
+
+        if self._observers:
+            self._changed("delete", [*keys, last_key])
 
     def __eq__(self, other) -> bool:
         return self.data == other
 
     def __getitem__(self, path: str):
+        if self._computed is not None and path in self._computed:
+            return self._computed.get(path)
+
         *keys, last_key = split_path(path, self.sep)
         item = traverse(data=self.data, keys=keys, original_path=path)
 
@@ -148,7 +1045,7 @@ class Cut:
         except IndexError as error:
             raise index_error(last_key, path, error)
         except TypeError:
-            raise type_error(last_key, path, item)
+            return traverse_adapted(item, [last_key], path)
 
     def __iter__(self) -> Iterator:
         return iter(self.data)
@@ -160,15 +1057,7 @@ class Cut:
         return not self.data == other
 
     def __setitem__(self, path: str, value) -> None:
-        *keys, last_key = split_path(path, self.sep)
-        item = traverse(data=self.data, keys=keys, original_path=path)
-
-        try:
-            item[last_key] = value
-        except IndexError as error:
-            raise index_error(last_key, path, error)
-        except TypeError:
-            raise type_error(last_key, path, item)
+        self.set_path(path, value, create=self.autovivify)
 
     def __str__(self) -> str:
         return str(self.data)
@@ -176,24 +1065,211 @@ class Cut:
     def __repr__(self) -> str:
         return f"Cut: {self.data}"
 
+    def _changed(self, op: str, keys: TKeyList, value=None) -> None:
+        for observer in self._observers:
+            observer.changed(op, keys, value)
+
+    def _changing(self, op: str, keys: TKeyList) -> None:
+        for observer in self._observers:
+            observer.changing(op, keys)
+
+    def _observe(self, observer: Observer) -> None:
+        self._observers = [*self._observers, observer]
+
+    def _observer(self, cls: Type[Observer]) -> Optional[Any]:
+        for observer in self._observers:
+            if type(observer) is cls:
+                return observer
+        return None
+
+    def _unobserve(self, observer: Observer) -> None:
+        self._observers = [item for item in self._observers if item is not observer]
+
+    def at(self, path: str) -> "SubCut":
+        """
+        Return a Cut over the value at `path`, whose lookups and writes skip
+        this prefix. It follows the value at `path` when it is replaced or
+        removed through this Cut, and its writes are notified to this Cut.
+
+        ex:
+            pokemon = proxy.at('pokemon[0]')
+            pokemon['level']
+            pokemon['moves.Tackle.power'] = 40
+        """
+        handles = self._observer(Handles)
+        if handles is None:
+            handles = Handles()
+            self._observe(handles)
+
+        handle = handles.get(path)
+        if handle is None:
+            handle = handles[path] = SubCut(self, path)
+        handle.data  # Missing paths raise the same errors as a lookup.
+        return handle
+
     def all(self: TCut, path: str) -> Iterator[TCut]:
         """Wrap each item of an Iterable."""
         items = self[path]
         cls = self.__class__
-        return (cls(_dict, self.sep) for _dict in items)
+        return (cls(_dict, self.sep, self.autovivify) for _dict in items)
 
     def clear(self) -> None:
-        return self.data.clear()
+        if self._observers:
+            self._changing("clear", [])
+        self.data.clear()
+        if self._observers:
+            self._changed("clear", [])
+
+    def compact(self, interner: Optional[Interner] = None) -> int:
+        """
+        Share the keys and the immutable values of the data with the other
+        documents compacted with the same `interner`, and return an estimate
+        of the bytes saved.
+
+        ex:
+            interner = Interner()
+            saved = sum(proxy.compact(interner) for proxy in proxies)
+        """
+        if interner is None:
+            interner = Interner()
+        return interner.compact(self.data)
+
+    def computed(
+        self, path: str, function: Callable, depends_on: Iterable[str]
+    ) -> None:
+        """
+        Register a value derived from the data, read at `path` and computed
+        by `function` called with this Cut. It is cached until one of the
+        paths it `depends_on` is written through this Cut.
+
+        ex:
+            proxy.computed(
+                'stats.ratio',
+                lambda proxy: proxy['data.ups'] / proxy['data.downs'],
+                depends_on=['data.ups', 'data.downs'],
+            )
+            proxy['stats.ratio']
+        """
+        if self._computed is None:
+            self._computed = ComputedPaths(self)
+            self._observe(self._computed)
+        self._computed.add(path, function, depends_on)
 
     def copy(self) -> dict:
         return self.data.copy()
 
+    def delete_many(self, paths: Iterable[str], missing_ok: bool = True) -> int:
+        """
+        Delete several paths at once and return how many items were deleted.
+
+        Common prefixes are traversed once, and the items of a list are
+        deleted from the last to the first so that indexes do not shift.
+
+        ex:
+            proxy.delete_many(['pokemon[0].category', 'pokemon[2]', 'trainers'])
+        """
+        changing = partial(self._changing, "delete") if self._observers else None
+        deleted = delete_trie(
+            self.data, build_trie(paths, self.sep), missing_ok, changing
+        )
+        if self._observers:
+            for keys in deleted:
+                self._changed("delete", keys)
+        return len(deleted)
+
+    def drain_changes(self) -> List[TChange]:
+        """
+        Return the (op, keys, value) changes made since the last call, where
+        op is 'set', 'delete' or 'clear'; see `track_changes`.
+
+        ex:
+            proxy.track_changes()
+            proxy['pokemon[0].level'] = 16
+            proxy.drain_changes()
+            # [('set', ('pokemon', 0, 'level'), 16)]
+        """
+        journal = self._observer(Journal)
+        return journal.drain() if journal is not None else []
+
+    def find(
+        self, predicate: Callable, prune: Optional[Callable] = None
+    ) -> Optional[Tuple[str, Any]]:
+        """
+        Return the (path, value) pair of the first value, in depth-first
+        order, for which `predicate` is true, or None. Subtrees whose root
+        value matches `prune` are not searched.
+
+        ex:
+            proxy.find(lambda value: value == 'Pallet Town')
+            # ('trainers[0].hometown', 'Pallet Town')
+        """
+        # Keys are kept as linked (parent, key) pairs so that a path is only
+        # built for the value found.
+        stack = [(None, self.data)]  # type: List[Tuple[Any, Any]]
+        while stack:
+            chain, value = stack.pop()
+            if chain is not None:
+                if predicate(value):
+                    return join_path(unchain(chain), self.sep), value
+                if prune is not None and prune(value):
+                    continue
+
+            children = child_items(value)
+            if children is None:
+                continue
+            for key, child in reversed(children):
+                stack.append(((chain, key), child))
+        return None
+
+    def fingerprint(self, path: str = "") -> str:
+        """
+        Return a hash of the value at `path`, or of the whole data, equal for
+        equal values. Hashes are cached for each subtree until a write
+        through this Cut reaches it, so they are only as fresh as the
+        writes made through it.
+
+        ex:
+            proxy.fingerprint('pokemon[0]')
+            # '5d0f7d6b4e2ef3c1e0c0b9e4d1a3f2b7'
+        """
+        fingerprints = self._observer(Fingerprints)
+        if fingerprints is None:
+            fingerprints = Fingerprints(self)
+            self._observe(fingerprints)
+
+        keys = split_path(path, self.sep) if path else []
+        # Missing paths raise the same errors as a lookup.
+        traverse(data=self.data, keys=keys, original_path=path)
+        return fingerprints.get(keys).hex()
+
     @classmethod
     def fromkeys(
         cls: Type[TCut], seq: Iterable, value: Optional[Iterable] = None
     ) -> TCut:
         return cls(dict.fromkeys(seq, value))
 
+    def index_on(self, path: str, key: str) -> ListIndex:
+        """
+        Index the items of the list at `path` by the value found at `key`
+        in each of them, for constant time lookups.
+
+        ex:
+            children = proxy.index_on('data.children', key='data.id')
+            children['cmq4jj']
+            # {'kind': 't3', 'data': {'id': 'cmq4jj', ...}}
+        """
+        for observer in self._observers:
+            if (
+                isinstance(observer, ListIndex)
+                and observer.path == path
+                and observer.key == key
+            ):
+                return observer
+
+        index = ListIndex(self, path, key)
+        self._observe(index)
+        return index
+
     def get(self, path: str, default=None):
         try:
             return self[path]
@@ -206,6 +1282,63 @@ class Cut:
     def items(self) -> ItemsView:
         return self.data.items()
 
+    def memory_usage(
+        self, max_depth: Optional[int] = 2, top: int = 10, sample: Optional[int] = None
+    ) -> List[Tuple[str, int]]:
+        """
+        Return the `top` heaviest values up to `max_depth` levels deep, as
+        (path, bytes) pairs where bytes is the deep size of the value. An
+        object met several times is only counted at its first path.
+
+        With `sample`, only `sample` items of the larger dicts and lists are
+        measured, and their size is extrapolated to all the items.
+
+        ex:
+            proxy.memory_usage(max_depth=3, top=2)
+            # [('data.children', 10485760), ('data.children[12]', 8388608)]
+        """
+        getsizeof = sys.getsizeof
+        seen = set()
+        measured = []  # type: List[Tuple[float, Optional[tuple]]]
+        # Containers are measured once their children are, through a frame
+        # holding their [own size, size of their children, scale].
+        stack = [(False, self.data, None, 0, None)]  # type: List[tuple]
+        while stack:
+            done, value, links, depth, parent = stack.pop()
+            if done:
+                size = value[0] + value[1] * value[2]
+            elif id(value) in seen:
+                continue
+            else:
+                seen.add(id(value))
+                size = getsizeof(value)
+                children = child_items(value)
+                if children:
+                    count = len(children)
+                    scale = 1.0
+                    if sample is not None and count > sample:
+                        scale = count / sample
+                        children = [children[int(i * scale)] for i in range(sample)]
+                    frame = [size, 0, scale]
+                    stack.append((True, frame, links, depth, parent))
+                    keyed = not isinstance(value, SEQUENCES)
+                    for key, child in reversed(children):
+                        if keyed and id(key) not in seen:
+                            seen.add(id(key))
+                            frame[1] += getsizeof(key)
+                        stack.append((False, child, (links, key), depth + 1, frame))
+                    continue
+
+            if parent is not None:
+                parent[1] += size
+            if depth and (max_depth is None or depth <= max_depth):
+                measured.append((size, links))
+
+        return [
+            (join_path(unchain(links), self.sep), round(size))
+            for size, links in heapq.nlargest(top, measured, key=itemgetter(0))
+        ]
+
     def pop(self, path: str, *args):
         *keys, last_key = split_path(path, self.sep)
 
@@ -216,8 +1349,11 @@ class Cut:
                 return args[0]
             raise error
 
+        if self._observers:
+            self._changing("delete", [*keys, last_key])
+
         try:
-            return item.pop(last_key)
+            value = item.pop(last_key)
         except KeyError as error:
             if args:
                 return args[0]
@@ -227,37 +1363,227 @@ class Cut:
                 return args[0]
             raise index_error(last_key, path, error)
         except AttributeError as error:
-            raise AttributeError(
-                f"Unable to pop item '{last_key}' in key '{path}': "
-                f"the element must be a dictionary or a list but is of type '{type(item)}'."
-            )
+            adapter = adapter_for(type(item))
+            if adapter is None:
+                raise AttributeError(
+                    f"Unable to pop item '{last_key}' in key '{path}': "
+                    f"the element must be a dictionary or a list but is of type '{type(item)}'."
+                )
+            if not adapter.contains(item, last_key):
+                if args:
+                    return args[0]
+                raise key_error(last_key, path, KeyError(last_key))
+            value = adapter.get(item, last_key)
+            adapter.delete(item, last_key)
+
+        if self._observers:
+            self._changed("delete", [*keys, last_key])
+        return value
 
     def popitem(self):
-        return self.data.popitem()
+        key, value = self.data.popitem()
+        if self._observers:
+            # The item is put back for observers to see it before its removal.
+            self.data[key] = value
+            self._changing("delete", [key])
+            del self.data[key]
+            self._changed("delete", [key])
+        return key, value
+
+    def prune(self, predicate: Optional[Callable] = None) -> int:
+        """
+        Remove the values for which `predicate` is true, then the dicts and
+        lists left empty, in one pass; and return how many were removed.
+
+        ex:
+            proxy.prune(lambda value: value is None)
+        """
+        removed = 0
+        # A frame holds a container, its keys, and the keys of its children
+        # to remove once they have been pruned themselves.
+        stack = [(self.data, [], None)]  # type: list
+        while stack:
+            container, prefix, matched = stack.pop()
+            children = child_items(container)  # type: Any
+
+            if matched is None:
+                matched = []
+                stack.append((container, prefix, matched))
+                for key, child in children:
+                    if predicate is not None and predicate(child):
+                        matched.append(key)
+                    elif isinstance(child, CONTAINERS) and child:
+                        stack.append((child, [*prefix, key], None))
+                continue
+
+            emptied = [
+                key
+                for key, child in children
+                if isinstance(child, CONTAINERS) and not child
+            ]
+            removals = {*matched, *emptied}
+            if isinstance(container, SEQUENCES):
+                removals = sorted(removals, reverse=True)  # type: ignore
+            for key in removals:
+                if self._observers:
+                    self._changing("delete", [*prefix, key])
+                del container[key]
+                removed += 1
+                if self._observers:
+                    self._changed("delete", [*prefix, key])
+
+        return removed
+
+    def query(self, expression: str) -> Iterator:
+        """
+        Lazily yield the values matched by a query expression, which extends
+        the path syntax with wildcards and filters.
+
+        ex:
+            proxy.query('pokemon[?level>=16].name')
+            proxy.query('pokemon[*].moves[0]')
+        """
+        return compile_query(expression, self.sep).evaluate(self.data)
+
+    def set_path(self, path: str, value, create: bool = False) -> None:
+        """
+        Set `value` at `path`, like `proxy[path] = value` does. With `create`,
+        missing dicts and lists are created along the way, and lists are
+        extended with None up to the index to set.
+
+        ex:
+            proxy.set_path('pokemon[3].moves[1].name', 'Growl', create=True)
+        """
+        keys = split_path(path, self.sep)
+        if self._observers:
+            self._changing("set", keys)
+        if create:
+            item = vivify(data=self.data, keys=keys, original_path=path)
+        else:
+            item = traverse(data=self.data, keys=keys[:-1], original_path=path)
+        *keys, last_key = keys
+
+        try:
+            item[last_key] = value
+        except IndexError as error:
+            raise index_error(last_key, path, error)
+        except TypeError:
+            adapter = adapter_for(type(item))
+            if adapter is None:
+                raise type_error(last_key, path, item)
+            adapter.set(item, last_key, value)
+
+        if self._observers:
+            self._changed("set", [*keys, last_key], value)
 
     def setdefault(self, path: str, default=None):
         *keys, last_key = split_path(path, self.sep)
+        if self._observers:
+            self._changing("set", [*keys, last_key])
 
         item = self.data
         for key in keys:
             try:
-                item = item[key]
+                item = get_item(item, key)
             except KeyError:
-                item[key] = {}
-                item = item[key]
+                set_item(item, key, {})
+                item = get_item(item, key)
             except IndexError as error:
                 raise index_error(key, path, error)
+            except TypeError:
+                raise type_error(key, path, item)
 
         try:
-            return item[last_key]
+            return get_item(item, last_key)
         except KeyError:
-            item[last_key] = default
-            return default
+            set_item(item, last_key, default)
         except IndexError as error:
             raise index_error(last_key, path, error)
         except TypeError:
             raise type_error(last_key, path, item)
 
+        if self._observers:
+            self._changed("set", [*keys, last_key], default)
+        return default
+
+    def subscribe(
+        self, path: str, callback: Callable, batch: bool = False
+    ) -> Callable[[], None]:
+        """
+        Call `callback(op, path, value)` whenever a value at or under `path`,
+        or one of its ancestors, is written through this Cut; and return a
+        function to unsubscribe. The empty path is notified of every write.
+
+        With `batch`, `callback` is given a list of (op, path, value) changes
+        instead, once for all the writes made by an update.
+
+        ex:
+            proxy.subscribe('pokemon[0]', lambda op, path, value: print(path))
+            proxy['pokemon[0].level'] = 16
+            # pokemon[0].level
+        """
+        subscriptions = self._observer(Subscriptions)
+        if subscriptions is None:
+            subscriptions = Subscriptions(self)
+            self._observe(subscriptions)
+        return subscriptions.add(path, callback, batch)
+
+    def to_json(self, cache: bool = True) -> bytes:
+        """
+        Return the data encoded as compact JSON. With `cache`, the encoding
+        of each subtree is kept, and a write through this Cut only has the
+        subtrees holding it encoded again. Values modified by other means,
+        like `proxy['pokemon'].append(...)`, are left stale: encode them
+        without `cache`.
+
+        ex:
+            proxy.to_json()
+            # b'{"pokemon":[{"name":"Bulbasaur",...}]}'
+        """
+        if not cache:
+            return _JSON_ENCODER.encode(self.data).encode()
+        fragments = self._observer(JsonFragments)
+        if fragments is None:
+            fragments = JsonFragments(self)
+            self._observe(fragments)
+        return fragments.get()
+
+    def track_changes(self, enabled: bool = True) -> None:
+        """Start, or stop, recording the writes made through this Cut."""
+        journal = self._observer(Journal)
+        if enabled and journal is None:
+            self._observe(Journal(self))
+        elif not enabled and journal is not None:
+            self._unobserve(journal)
+
+    @contextmanager
+    def transaction(self: TCut) -> Iterator[TCut]:
+        """
+        Undo the writes made through this Cut within the block when it
+        raises. Only the prior state of the written items is recorded, and
+        nested transactions roll back to where they started.
+
+        ex:
+            with proxy.transaction():
+                proxy.update({'pokemon[0].level': 16, 'pokemon[0].name': 'Ivysaur'})
+                validate(proxy.data)
+        """
+        undo_log = self._observer(UndoLog)
+        owner = undo_log is None
+        if owner:
+            undo_log = UndoLog(self)
+            self._observe(undo_log)
+        assert undo_log is not None
+        savepoint = len(undo_log)
+        try:
+            yield self
+        except BaseException:
+            undo_log.rollback(savepoint)
+            raise
+        finally:
+            if owner:
+                self._unobserve(undo_log)
+
     def update(self, data=None, **kwargs):
         data = data or {}
         try:
@@ -266,8 +1592,168 @@ class Cut:
         except AttributeError:
             pairs = chain(data, kwargs.items())
 
-        for key, value in pairs:
-            self.__setitem__(key, value)
+        subscriptions = self._observer(Subscriptions)
+        holding = subscriptions is not None and subscriptions.hold()
+        try:
+            for key, value in pairs:
+                self.__setitem__(key, value)
+        finally:
+            if holding:
+                subscriptions.release()  # type: ignore
 
     def values(self) -> ValuesView:
         return self.data.values()
+
+    def walk(
+        self, max_depth: Optional[int] = None, prune: Optional[Callable] = None
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Lazily yield the (path, value) pair of every nested value, in
+        depth-first order. Values deeper than `max_depth` are not visited,
+        nor are the children of the values matching `prune`.
+
+        ex:
+            for path, value in proxy.walk(max_depth=2):
+                print(path, value)
+        """
+        sep = self.sep
+        # Children are stacked with the path of their parent, and their own
+        # path is only built once they are popped out.
+        stack = [("", None, self.data, 0)]  # type: List[Tuple[str, Any, Any, int]]
+        while stack:
+            path, key, value, depth = stack.pop()
+            if depth:
+                if isinstance(key, int):
+                    path = f"{path}[{key}]"
+                elif depth > 1:
+                    path = f"{path}{sep}{key}"
+                else:
+                    path = f"{key}"
+                yield path, value
+                if prune is not None and prune(value):
+                    continue
+
+            if max_depth is not None and depth >= max_depth:
+                continue
+            children = child_items(value)
+            if children is None:
+                continue
+            for key, child in reversed(children):
+                stack.append((path, key, child, depth + 1))
+
+
+class Handles(Observer):
+    """
+    The SubCuts of a Cut by path, held until they are not used anymore.
+
+    They are marked stale when a write reaches their anchor or one of its
+    ancestors, and the observers of a SubCut are notified of the writes
+    made under its anchor.
+    """
+
+    __slots__ = ("_handles",)
+
+    def __init__(self) -> None:
+        self._handles = WeakValueDictionary()  # type: WeakValueDictionary
+
+    def __getitem__(self, path: str) -> "SubCut":
+        return self._handles[path]
+
+    def __setitem__(self, path: str, handle: "SubCut") -> None:
+        self._handles[path] = handle
+
+    def get(self, path: str) -> Optional["SubCut"]:
+        return self._handles.get(path)
+
+    def changed(self, op: str, keys: TKeyList, value) -> None:
+        scope = keys
+        if op == "delete" and keys and isinstance(keys[-1], int):
+            # Removing a list item shifts all the items that follow it.
+            scope = keys[:-1]
+
+        for handle in list(self._handles.values()):
+            anchor = handle._keys
+            if handle._forwarding or not overlaps(op, keys, anchor):
+                continue
+            if len(scope) <= len(anchor):
+                handle._resolved = _MISSING
+                handle._notify("clear", [], None)
+            else:
+                handle._notify(op, keys[len(anchor) :], value)
+
+
+class _Forward(Observer):
+    """Notify the Cut a SubCut belongs to of the writes made through it."""
+
+    __slots__ = ("handle",)
+
+    def __init__(self, handle: "SubCut") -> None:
+        self.handle = handle
+
+    def changing(self, op: str, keys: TKeyList) -> None:
+        handle = self.handle
+        handle.parent._changing(op, [*handle._keys, *keys])
+
+    def changed(self, op: str, keys: TKeyList, value) -> None:
+        handle = self.handle
+        handle._forwarding = True
+        try:
+            handle.parent._changed(op, [*handle._keys, *keys], value)
+        finally:
+            handle._forwarding = False
+
+
+class SubCut(Cut):
+    """
+    A Cut over the value at a path of another Cut, created by `Cut.at`.
+
+    The value is looked up once, and again after a write through the other
+    Cut has replaced or removed it.
+    """
+
+    __slots__ = ("parent", "anchor", "_keys", "_resolved", "_forwarding", "__weakref__")
+
+    def __init__(self, parent: Cut, path: str) -> None:
+        self.parent = parent
+        self.anchor = path
+        self.sep = parent.sep
+        self.autovivify = parent.autovivify
+        self._keys = split_path(path, parent.sep)
+        self._resolved = _MISSING
+        self._forwarding = False
+        self._observers = [_Forward(self)]  # type: Sequence[Observer]
+        self._computed = None
+
+    def __repr__(self) -> str:
+        return f"SubCut: {self.anchor}: {self.data}"
+
+    @property  # type: ignore
+    def data(self):
+        if self._resolved is _MISSING:
+            self._resolved = traverse(
+                data=self.parent.data, keys=self._keys, original_path=self.anchor
+            )
+        return self._resolved
+
+    @data.setter
+    def data(self, value) -> None:
+        self.parent.set_path(self.anchor, value)
+
+    def _notify(self, op: str, keys: TKeyList, value) -> None:
+        """Notify the observers of this SubCut of a write made by its parent."""
+        for observer in self._observers:
+            if not isinstance(observer, _Forward):
+                observer.changed(op, keys, value)
+
+    def all(self, path: str) -> Iterator[Cut]:  # type: ignore
+        return (Cut(item, self.sep, self.autovivify) for item in self[path])
+
+    def clear(self) -> None:
+        # Items are deleted one by one, as clearing the value at the anchor
+        # only means something to the parent as a set of deletions.
+        data = self.data
+        keys = list(data) if isinstance(data, Mapping) else range(len(data))
+        for key in reversed(keys):
+            self._changing("delete", [key])
+            del data[key]
+            self._changed("delete", [key])
@@ -0,0 +1,88 @@
+"""
+    Check the types of the values at many paths of documents at once.
+"""
+from typing import Dict, List, Tuple, Union
+
+from .adapters import get_item
+from .scalpl import LEAF, build_trie
+
+TExpected = Union[type, Tuple[type, ...]]
+
+
+def _leaves(node: dict) -> List[str]:
+    """Return the paths ending in the subtree of a trie node."""
+    paths = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        for key, child in node.items():
+            if key is LEAF:
+                paths.append(child)
+            else:
+                stack.append(child)
+    return paths
+
+
+def _type_names(expected: TExpected) -> str:
+    if isinstance(expected, tuple):
+        return " or ".join(cls.__name__ for cls in expected)
+    return expected.__name__
+
+
+class Validator:
+    """
+    Validator checks that documents hold a value of the expected type at
+    each path of a schema, in a single traversal of their common prefixes,
+    and reports every failure at once. `object` only requires a path.
+
+    ex:
+        validator = Validator({'data.modhash': str, 'data.children[0].data.score': int})
+        validator.validate(document)
+        # [('data.modhash', 'expected str, got NoneType')]
+    """
+
+    __slots__ = ("schema", "sep", "_trie", "_checks")
+
+    def __init__(self, schema: Dict[str, TExpected], sep: str = ".") -> None:
+        self.schema = dict(schema)
+        self.sep = sep
+        self._trie = build_trie(self.schema, sep)
+        # Path: (expected types, their names, position in the schema).
+        self._checks = {
+            path: (expected, _type_names(expected), position)
+            for position, (path, expected) in enumerate(self.schema.items())
+        }  # type: Dict[str, Tuple[TExpected, str, int]]
+
+    def __call__(self, data) -> List[Tuple[str, str]]:
+        return self.validate(data)
+
+    def __repr__(self) -> str:
+        return f"Validator: {', '.join(self.schema)}"
+
+    def validate(self, data) -> List[Tuple[str, str]]:
+        """
+        Return the (path, reason) pairs of the failed checks, in the order
+        of the schema, or an empty list when `data` is valid.
+        """
+        checks = self._checks
+        failures = []
+        stack = [(data, self._trie)]
+        while stack:
+            value, node = stack.pop()
+            for key, child in node.items():
+                if key is LEAF:
+                    expected, names, _ = checks[child]
+                    if not isinstance(value, expected):
+                        reason = f"expected {names}, got {type(value).__name__}"
+                        failures.append((child, reason))
+                    continue
+
+                try:
+                    item = get_item(value, key)
+                except (KeyError, IndexError, TypeError):
+                    failures.extend((path, "missing") for path in _leaves(child))
+                    continue
+                stack.append((item, child))
+
+        failures.sort(key=lambda failure: checks[failure[0]][2])
+        return failures
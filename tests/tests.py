@@ -1,7 +1,18 @@
-from collections import defaultdict, OrderedDict
+from collections import defaultdict, namedtuple, OrderedDict
 from copy import deepcopy
+from dataclasses import dataclass
 from functools import partial
-from scalpl.scalpl import Cut, split_path, traverse
+import json
+import math
+import random
+import sys
+from scalpl.adapters import Adapter, register_adapter
+from scalpl.interner import Interner
+from scalpl.lazy import LazyCut
+from scalpl.pipeline import Pipeline
+from scalpl.records import group_by, sort_by, top_k
+from scalpl.validator import Validator
+from scalpl.scalpl import Cut, JsonFragments, join_path, split_path, traverse
 import pytest
 from types import GeneratorType
 
@@ -70,6 +81,22 @@ class TestSplitPath:
         assert str(error.value) == str(expected_error)
 
 
+@pytest.mark.parametrize(
+    "keys,path",
+    [
+        ([""], ""),
+        (["users"], "users"),
+        (["users", "names", "first-name"], "users.names.first-name"),
+        (["users", 0, 1], "users[0][1]"),
+        (["users", 0, 1, "name"], "users[0][1].name"),
+        (["", "users"], ".users"),
+    ],
+)
+def test_join_path(keys, path):
+    assert join_path(keys, ".") == path
+    assert split_path(path, ".") == keys
+
+
 class TestTraverse:
     @pytest.mark.parametrize(
         "data,keys,original_path,result",
@@ -627,3 +654,1315 @@ class TestSetdefault:
         )
 
         assert str(error.value) == expected_error_message
+
+
+class TestLazyCut:
+    DOCUMENT = {
+        "kind": "Listing",
+        "data": {
+            "modhash": "",
+            "children": [
+                {"kind": "t3", "data": {"id": "a", "score": 12, "tags": []}},
+                {"kind": "t3", "data": {"id": "b", "score": 3, "tags": ["x"]}},
+            ],
+            "after": None,
+        },
+    }
+
+    @pytest.fixture(params=[bytes, bytearray, memoryview, bytes.decode])
+    def proxy(self, request):
+        document = json.dumps(self.DOCUMENT, indent=2).encode()
+        return LazyCut.from_json(request.param(document))
+
+    @pytest.mark.parametrize(
+        "path,result",
+        [
+            ("kind", "Listing"),
+            ("data.children[1].data.id", "b"),
+            ("data.children[-1].data.score", 3),
+            ("data.children[0].data.tags", []),
+            ("data.after", None),
+            ("data.children[1]", DOCUMENT["data"]["children"][1]),
+        ],
+    )
+    def test_getitem(self, proxy, path, result):
+        assert proxy[path] == result
+
+    def test_returns_plain_objects(self, proxy):
+        children = proxy["data.children"]
+        assert type(children) is list
+        assert proxy["data.children"] is children
+
+    def test_errors(self, proxy):
+        with pytest.raises(KeyError):
+            proxy["data.missing"]
+        with pytest.raises(IndexError):
+            proxy["data.children[2]"]
+        assert proxy.get("data.children[2].data", 42) == 42
+        assert "data.children[0].data.id" in proxy
+
+    def test_write(self, proxy):
+        proxy["data.children[0].data.score"] = 42
+        del proxy["data.modhash"]
+        assert proxy["data.children[0].data.score"] == 42
+        assert "data.modhash" not in proxy
+
+    def test_materialize(self, proxy):
+        proxy["data.children[0].data.id"]
+        assert proxy.materialize() == self.DOCUMENT
+        assert proxy == self.DOCUMENT
+
+    @pytest.mark.parametrize(
+        "document",
+        [
+            '{"a": 1, "a": 2}',
+            '{"a": {"a": 0}, "b": 1, "a": 2}',
+            '{"a": 1, "\\u0061": 2}',
+            '{"a": 1, "s": "\\"a\\"", "a": 2}',
+        ],
+    )
+    def test_duplicate_keys(self, document):
+        proxy = LazyCut.from_json(document)
+        assert len(proxy.data) == len(json.loads(document))
+        assert proxy["a"] == json.loads(document)["a"]
+        assert LazyCut.from_json(document).materialize() == json.loads(document)
+
+    def test_duplicate_keys_once_read(self):
+        proxy = LazyCut.from_json('{"a": 1, "b": 0, "a": 2}')
+        assert proxy["a"] == 1
+        assert proxy["b"] == 0
+        assert proxy.materialize() == {"a": 1, "b": 0}
+
+    def test_repeated_names_are_not_scanned_for(self):
+        child = {"kind": "t3", "data": {"id": "a", "kind": "link"}}
+        document = {
+            "kind": "Listing",
+            "data": {"children": [child] * 100, "after": None},
+            "after": None,
+        }
+        proxy = LazyCut.from_json(json.dumps(document))
+        assert proxy["kind"] == "Listing"
+        assert proxy["data.children[0].kind"] == "t3"
+        # The members after those read are left as they are.
+        assert list(proxy.data._members) == ["kind", "data"]
+        assert list(proxy.data["data"]._members) == ["children"]
+        assert list(proxy.data["data"]["children"][0]._members) == ["kind"]
+
+    @pytest.mark.parametrize("path", ["s", "t.u", "v", "w[1]"])
+    def test_lookup_order(self, path):
+        document = '{"s": "\\\\", "t": {"u": "\\"}"}, "v": [[[[]]]], "w": [1, 2]}'
+        proxy = LazyCut.from_json(document)
+        assert proxy["w[0]"] == 1
+        assert proxy[path] == Cut(json.loads(document))[path]
+
+    def test_deep_nesting(self):
+        document = {"deep": [[[{"a": [{"b": [0]}]}]]] * 4, "end": True}
+        for _ in range(5):
+            document = {"x": document, "y": [document]}
+        proxy = LazyCut.from_json(json.dumps(document))
+        assert proxy["y[0].y[0].x.y[0].x.end"] is True
+        assert proxy.materialize() == document
+
+    def test_whole_document_operations(self, proxy):
+        cut = Cut(json.loads(json.dumps(self.DOCUMENT)))
+        assert list(proxy.walk()) == list(cut.walk())
+        found = proxy.find(lambda value: value == "x")
+        assert found == ("data.children[1].data.tags[0]", "x")
+        assert proxy.to_json() == cut.to_json()
+        assert proxy.fingerprint() == cut.fingerprint()
+        assert list(proxy.query("data.children[*].data.id")) == ["a", "b"]
+        assert proxy.prune(lambda value: value is None) == 2
+        assert proxy.materialize() == {
+            "kind": "Listing",
+            "data": {
+                "modhash": "",
+                "children": [
+                    {"kind": "t3", "data": {"id": "a", "score": 12}},
+                    {"kind": "t3", "data": {"id": "b", "score": 3, "tags": ["x"]}},
+                ],
+            },
+        }
+
+    @pytest.mark.parametrize(
+        "document",
+        [
+            b'{"a": [1, 2',
+            b'{"a" 1}',
+            b'{"a": "x}',
+            b"[1 2]",
+            b'{"a": 1,}',
+            b"[1, ]",
+            b'{"a": 1 "b": 2}',
+        ],
+    )
+    def test_malformed_document(self, document):
+        with pytest.raises(json.JSONDecodeError):
+            LazyCut.from_json(document).materialize()
+
+
+class TestQuery:
+    DOCUMENT = {
+        "pokemon": [
+            {"name": "Bulbasaur", "level": 12, "type": "Grass", "moves": ["Tackle"]},
+            {"name": "Charmander", "level": 18, "type": "Fire", "moves": ["Ember"]},
+            {"name": "Squirtle", "level": 16, "type": "Water.Ice", "moves": []},
+        ]
+    }
+
+    @pytest.mark.parametrize(
+        "expression,result",
+        [
+            ("pokemon[0].name", ["Bulbasaur"]),
+            ("pokemon[3].name", []),
+            ("pokemon[*].level", [12, 18, 16]),
+            ("pokemon[*].moves[0]", ["Tackle", "Ember"]),
+            ("pokemon[?level>12].name", ["Charmander", "Squirtle"]),
+            ("pokemon[?level==16].name", ["Squirtle"]),
+            ('pokemon[?type=="Water.Ice"].name', ["Squirtle"]),
+            ("pokemon[?type!='Fire'].name", ["Bulbasaur", "Squirtle"]),
+            ("pokemon[?moves[0]].name", ["Bulbasaur", "Charmander"]),
+            ("pokemon[?type>12].name", []),
+        ],
+    )
+    def test_query(self, dict_type, expression, result):
+        proxy = Cut(dict_type(self.DOCUMENT))
+        assert list(proxy.query(expression)) == result
+
+    def test_return_generator(self):
+        proxy = Cut(self.DOCUMENT)
+        assert isinstance(proxy.query("pokemon[*].name"), GeneratorType) is True
+
+    def test_custom_separator(self):
+        proxy = Cut(self.DOCUMENT, sep="/")
+        assert list(proxy.query("pokemon[?level<16]/name")) == ["Bulbasaur"]
+
+    @pytest.mark.parametrize(
+        "expression",
+        ["pokemon[", "pokemon[]", "pokemon[0", "pokemon[?]", "pokemon[? ]"],
+    )
+    def test_error_when_missing_brackets(self, expression):
+        with pytest.raises(ValueError) as error:
+            Cut().query(expression)
+
+        assert str(error.value) == f"Key '{expression}' is badly formated."
+
+    def test_error_when_filter_is_not_a_path(self):
+        with pytest.raises(ValueError) as error:
+            Cut().query("pokemon[?moves[*]==1]")
+
+        expected_error = ValueError(
+            "Unable to filter items in key 'pokemon[?moves[*]==1]': "
+            "a filter can only test a path made of keys and indexes."
+        )
+        assert str(error.value) == str(expected_error)
+
+
+class TestIndexOn:
+    def setup_method(self):
+        self.proxy = Cut(
+            {"data": {"children": [{"data": {"id": key}} for key in "abc"], "dist": 3}}
+        )
+
+    def test_lookup(self):
+        index = self.proxy.index_on("data.children", key="data.id")
+        assert index["b"] == {"data": {"id": "b"}}
+        assert index.position("c") == 2
+        assert "d" not in index
+        assert sorted(index) == ["a", "b", "c"]
+
+    def test_same_index_is_returned(self):
+        index = self.proxy.index_on("data.children", key="data.id")
+        assert self.proxy.index_on("data.children", key="data.id") is index
+
+    def test_items_without_key_are_ignored(self):
+        self.proxy["data.children[1]"] = {"data": {}}
+        index = self.proxy.index_on("data.children", key="data.id")
+        assert sorted(index) == ["a", "c"]
+
+    @pytest.mark.parametrize(
+        "operation",
+        [
+            lambda proxy: proxy.__delitem__("data.children[0]"),
+            lambda proxy: proxy.pop("data.children[0]"),
+            lambda proxy: proxy.__setitem__("data.children[0].data.id", "z"),
+            lambda proxy: proxy.update({"data.children": [{"data": {"id": "b"}}]}),
+        ],
+    )
+    def test_invalidated_by_writes_on_the_list(self, operation):
+        index = self.proxy.index_on("data.children", key="data.id")
+        index.position("b")
+        operation(self.proxy)
+        expected = [item["data"].get("id") for item in self.proxy["data.children"]]
+        assert index.position("b") == expected.index("b")
+
+    def test_kept_by_writes_elsewhere(self):
+        index = self.proxy.index_on("data.children", key="data.id")
+        index.position("b")
+        self.proxy["data.dist"] = 4
+        self.proxy["data.children"].insert(0, {"data": {"id": "z"}})
+        assert index.position("b") == 1
+        index.refresh()
+        assert index.position("b") == 2
+
+    def test_type_error(self):
+        index = self.proxy.index_on("data.dist", key="data.id")
+        with pytest.raises(TypeError) as error:
+            index["a"]
+
+        expected_error = TypeError(
+            "Cannot index 'data.dist': "
+            "the element must be a list but is of type '<class 'int'>'."
+        )
+        assert str(error.value) == str(expected_error)
+
+
+class TestAutovivify:
+    @pytest.mark.parametrize(
+        "data,key,result",
+        [
+            ({}, "a.b.c", {"a": {"b": {"c": 42}}}),
+            ({}, "a[2]", {"a": [None, None, 42]}),
+            ({}, "a[1].b", {"a": [None, {"b": 42}]}),
+            ({}, "a[0][1]", {"a": [[None, 42]]}),
+            ({"a": [1]}, "a[2]", {"a": [1, None, 42]}),
+            ({"a": [1, None]}, "a[1].b", {"a": [1, {"b": 42}]}),
+            ({"a": {"b": 1}}, "a.c.d", {"a": {"b": 1, "c": {"d": 42}}}),
+        ],
+    )
+    def test_setitem(self, dict_type, data, key, result):
+        proxy = Cut(dict_type(deepcopy(data)), autovivify=True)
+        proxy[key] = 42
+        assert proxy == result
+
+    def test_set_path(self):
+        proxy = Cut({"a": []})
+        proxy.set_path("a[1].b", 42, create=True)
+        assert proxy == {"a": [None, {"b": 42}]}
+
+    def test_set_path_without_create(self):
+        proxy = Cut({"a": []})
+        with pytest.raises(IndexError):
+            proxy.set_path("a[1]", 42)
+
+    def test_all_keeps_autovivify(self):
+        proxy = Cut({"users": [{}]}, autovivify=True)
+        for user in proxy.all("users"):
+            user["name.first"] = "Ash"
+        assert proxy["users[0].name.first"] == "Ash"
+
+    def test_index_error(self):
+        proxy = Cut({"a": [1]}, autovivify=True)
+        with pytest.raises(IndexError) as error:
+            proxy["a[-2].b"] = 42
+
+        expected_error = IndexError(
+            "Cannot access index '-2' in path 'a[-2].b', "
+            f"because of error: {repr(IndexError('list index out of range'))}."
+        )
+        assert str(error.value) == str(expected_error)
+
+    @pytest.mark.parametrize(
+        "data,key", [({}, "x[-1]"), ({}, "a.x[-1]"), ({"a": []}, "a[2][-1]")]
+    )
+    def test_index_error_creates_nothing(self, data, key):
+        proxy = Cut(deepcopy(data))
+        with pytest.raises(IndexError):
+            proxy.set_path(key, 42, create=True)
+        assert proxy == data
+
+    def test_type_error(self):
+        proxy = Cut({"a": 1}, autovivify=True)
+        with pytest.raises(TypeError) as error:
+            proxy["a.b"] = 42
+
+        expected_error = TypeError(
+            f"Cannot access key 'b' in path 'a.b': "
+            f"the element must be a dictionary or a list but is of type '<class 'int'>'."
+        )
+        assert str(error.value) == str(expected_error)
+
+
+class TestDeleteMany:
+    def test_delete_many(self, dict_type):
+        proxy = Cut(
+            dict_type(
+                {
+                    "a": [{"x": 1, "y": 2}, {"x": 3}, {"x": 4}, 5],
+                    "b": {"c": 1, "d": 2},
+                    "e": 3,
+                }
+            )
+        )
+        deleted = proxy.delete_many(["a[0].x", "a[1]", "a[-1]", "a[3]", "b.c", "e"])
+        assert deleted == 5
+        assert proxy == {"a": [{"y": 2}, {"x": 4}], "b": {"d": 2}}
+
+    def test_ignore_missing_paths(self):
+        proxy = Cut({"a": [1], "b": {}})
+        assert proxy.delete_many(["a[1]", "b.c", "c.d"]) == 0
+        assert proxy == {"a": [1], "b": {}}
+
+    def test_key_error(self):
+        proxy = Cut({"a": {"b": 1}})
+        with pytest.raises(KeyError) as error:
+            proxy.delete_many(["a.b", "a.c"], missing_ok=False)
+
+        expected_error = KeyError(
+            f"Cannot access key 'c' in path 'a.c', because of error: {repr(KeyError('c'))}."
+        )
+        assert str(error.value) == str(expected_error)
+
+    def test_index_error(self):
+        proxy = Cut({"a": [1]})
+        with pytest.raises(IndexError) as error:
+            proxy.delete_many(["a[1].b"], missing_ok=False)
+
+        expected_error = IndexError(
+            "Cannot access index '1' in path 'a[1].b', "
+            f"because of error: {repr(IndexError('list index out of range'))}."
+        )
+        assert str(error.value) == str(expected_error)
+
+
+class TestPrune:
+    def test_remove_empty_containers(self, dict_type):
+        proxy = Cut(dict_type({"a": {"b": {"c": {}}}, "d": [[], [[]], 1], "e": ""}))
+        assert proxy.prune() == 6
+        assert proxy == {"d": [1], "e": ""}
+
+    def test_remove_matching_values(self, dict_type):
+        proxy = Cut(dict_type({"a": [None, {"x": None}, 3], "b": {"c": None}, "d": 0}))
+        assert proxy.prune(lambda value: value is None) == 5
+        assert proxy == {"a": [3], "d": 0}
+
+    def test_matching_subtrees_are_not_visited(self):
+        visited = []
+
+        def predicate(value):
+            visited.append(value)
+            return isinstance(value, dict) and "secret" in value
+
+        proxy = Cut({"a": {"secret": {"b": 1}}, "c": {"d": 2}})
+        proxy.prune(predicate)
+        assert proxy == {"c": {"d": 2}}
+        assert {"b": 1} not in visited
+
+
+class TestDrainChanges:
+    def test_nothing_recorded_by_default(self):
+        proxy = Cut({"a": 1})
+        proxy["a"] = 2
+        assert proxy.drain_changes() == []
+
+    def test_record_writes(self, dict_type):
+        proxy = Cut(dict_type({"a": {"b": 1}, "c": [1, 2], "d": 3}))
+        proxy.track_changes()
+        proxy["a.b"] = 2
+        proxy.update({"a.e": 3})
+        proxy.setdefault("f.g", 4)
+        proxy.setdefault("f.g", 5)
+        del proxy["c[1]"]
+        proxy.pop("d")
+        assert proxy.drain_changes() == [
+            ("set", ("a", "b"), 2),
+            ("set", ("a", "e"), 3),
+            ("set", ("f", "g"), 4),
+            ("delete", ("c", 1), None),
+            ("delete", ("d",), None),
+        ]
+        assert proxy.drain_changes() == []
+
+    def test_coalesce_writes_to_the_same_path(self):
+        proxy = Cut({"a": 1, "b": 1})
+        proxy.track_changes()
+        proxy["a"] = 2
+        proxy["b"] = 2
+        proxy["a"] = 3
+        assert proxy.drain_changes() == [("set", ("b",), 2), ("set", ("a",), 3)]
+
+    def test_list_deletions_are_not_coalesced_across(self):
+        proxy = Cut({"a": [{"x": 0}, {"x": 0}, {"x": 0}]})
+        proxy.track_changes()
+        proxy["a[1].x"] = 1
+        del proxy["a[0]"]
+        proxy["a[1].x"] = 2
+        assert proxy.drain_changes() == [
+            ("set", ("a", 1, "x"), 1),
+            ("delete", ("a", 0), None),
+            ("set", ("a", 1, "x"), 2),
+        ]
+
+    def test_list_deletion_is_kept_when_rewritten(self):
+        proxy = Cut({"l": [1, 2, 3]})
+        proxy.track_changes()
+        del proxy["l[0]"]
+        proxy["l[0]"] = 9
+        assert proxy.drain_changes() == [
+            ("delete", ("l", 0), None),
+            ("set", ("l", 0), 9),
+        ]
+
+    def test_write_supersedes_changes_under_it(self):
+        proxy = Cut({"c": 0})
+        proxy.track_changes()
+        proxy["c"] = {"x": 0}
+        proxy["c.x"] = 5
+        proxy["c"] = {"y": 1}
+        assert proxy.drain_changes() == [("set", ("c",), {"y": 1})]
+
+    @pytest.mark.parametrize("seed", range(200))
+    def test_replay(self, seed):
+        original = {"a": {"x": 0, "l": [0, {"z": 1}, 2]}, "c": 0}
+        paths = ["a", "a.x", "a.l", "a.l[0]", "a.l[-1]", "a.l[1].z", "c", "c.x", "d"]
+        values = [0, {"x": 0}, {"x": {"z": 1}}, [0, {"z": 1}]]
+        generator = random.Random(seed)
+        proxy = Cut(deepcopy(original), autovivify=True)
+        proxy.track_changes()
+        for _ in range(12):
+            path = generator.choice(paths)
+            try:
+                if generator.random() < 0.7:
+                    proxy[path] = deepcopy(generator.choice(values))
+                else:
+                    proxy.pop(path, None)
+            except (AttributeError, IndexError, TypeError):
+                pass
+
+        replica = Cut(deepcopy(original), autovivify=True)
+        for op, keys, value in proxy.drain_changes():
+            if op == "set":
+                replica[join_path(keys, ".")] = deepcopy(value)
+            else:
+                replica.pop(join_path(keys, "."), None)
+        assert replica == proxy.data
+
+    def test_clear_supersedes_previous_changes(self):
+        proxy = Cut({"a": 1})
+        proxy.track_changes()
+        proxy["a"] = 2
+        proxy.clear()
+        proxy["b"] = 1
+        assert proxy.drain_changes() == [("clear", (), None), ("set", ("b",), 1)]
+
+    def test_stop_tracking(self):
+        proxy = Cut({"a": 1})
+        proxy.track_changes()
+        proxy.track_changes(False)
+        proxy["a"] = 2
+        assert proxy.drain_changes() == []
+
+
+class TestWalk:
+    DOCUMENT = {"a": {"b": [1, {"c": 2}]}, "d": 3}
+
+    def test_return_generator(self):
+        assert isinstance(Cut(self.DOCUMENT).walk(), GeneratorType) is True
+
+    def test_walk(self, dict_type):
+        proxy = Cut(dict_type(self.DOCUMENT))
+        assert list(proxy.walk()) == [
+            ("a", {"b": [1, {"c": 2}]}),
+            ("a.b", [1, {"c": 2}]),
+            ("a.b[0]", 1),
+            ("a.b[1]", {"c": 2}),
+            ("a.b[1].c", 2),
+            ("d", 3),
+        ]
+
+    def test_max_depth(self):
+        proxy = Cut(self.DOCUMENT)
+        assert [path for path, _ in proxy.walk(max_depth=2)] == ["a", "a.b", "d"]
+
+    def test_prune(self):
+        proxy = Cut(self.DOCUMENT)
+        walk = proxy.walk(prune=lambda value: isinstance(value, dict) and "b" in value)
+        assert [path for path, _ in walk] == ["a", "d"]
+
+    def test_custom_separator(self):
+        proxy = Cut(self.DOCUMENT, sep="/")
+        for path, value in proxy.walk():
+            assert proxy[path] == value
+
+    def test_deep_document(self):
+        document = node = {}
+        for _ in range(5000):
+            node["n"] = node = {}
+        assert len(list(Cut(document).walk())) == 5000
+
+
+class TestFind:
+    DOCUMENT = {"a": {"b": [1, {"c": 2}]}, "d": 2}
+
+    def test_find(self, dict_type):
+        proxy = Cut(dict_type(self.DOCUMENT))
+        assert proxy.find(lambda value: value == 2) == ("a.b[1].c", 2)
+
+    def test_not_found(self):
+        assert Cut(self.DOCUMENT).find(lambda value: value == 42) is None
+
+    def test_prune(self):
+        proxy = Cut(self.DOCUMENT)
+        found = proxy.find(
+            lambda value: value == 2, prune=lambda value: isinstance(value, list)
+        )
+        assert found == ("d", 2)
+
+
+class TestCompact:
+    @staticmethod
+    def document():
+        # Decoded documents never share their keys and values.
+        return json.loads(
+            '{"subreddit": "Python", "score": 1234, "tags": ["news", "news"], '
+            '"pair": [1, 1.0], "text": "' + "x" * 100 + '"}'
+        )
+
+    def test_share_keys_and_values(self):
+        interner = Interner()
+        first, second = Cut(self.document()), Cut(self.document())
+        first.compact(interner)
+        assert second.compact(interner) > 0
+
+        assert first["subreddit"] is second["subreddit"]
+        assert first["score"] is second["score"]
+        assert first["tags[1]"] is second["tags[0]"]
+        assert list(first)[0] is list(second)[0]
+        assert first == second == self.document()
+
+    def test_keep_values_of_different_types_apart(self):
+        proxy = Cut(self.document())
+        proxy.compact()
+        assert type(proxy["pair[0]"]) is int
+        assert type(proxy["pair[1]"]) is float
+
+    def test_long_strings_are_not_shared(self):
+        interner = Interner(max_length=64)
+        first, second = Cut(self.document()), Cut(self.document())
+        first.compact(interner)
+        second.compact(interner)
+        assert first["text"] is not second["text"]
+
+    def test_report_bytes_saved(self):
+        interner = Interner()
+        first, second = Cut(self.document()), Cut(self.document())
+        saved = first.compact(interner) + second.compact(interner)
+        assert saved == interner.saved > 0
+        assert second.compact(interner) == 0
+
+    def test_intern_tuples(self):
+        interner = Interner()
+        assert interner.intern((1, "a")) is interner.intern((1, "a"))
+        assert interner.intern((1, "a")) is not interner.intern((1.0, "a"))
+
+    def test_keep_signed_zeros_apart(self):
+        interner = Interner()
+        Cut({"x": 0.0}).compact(interner)
+        proxy = Cut({"x": -0.0, "u": (-0.0,), "z": complex(0.0, -0.0)})
+        proxy.compact(interner)
+        assert math.copysign(1, proxy["x"]) == -1
+        assert math.copysign(1, proxy["u"][0]) == -1
+        assert math.copysign(1, proxy["z"].imag) == -1
+        assert interner.intern((0.0,)) is not interner.intern((-0.0,))
+
+
+class TestPipeline:
+    @staticmethod
+    def records():
+        return [
+            {"data": {"id": key, "score": score, "secret": "x", "tags": ["a", "b"]}}
+            for key, score in (("a", 12), ("b", 3), ("c", 42))
+        ]
+
+    def test_return_generator(self):
+        assert isinstance(Pipeline().run(self.records()), GeneratorType) is True
+
+    def test_where(self):
+        pipeline = Pipeline().where("data.score", lambda score: score > 10)
+        assert [record["data"]["id"] for record in pipeline(self.records())] == [
+            "a",
+            "c",
+        ]
+
+    def test_consecutive_where(self):
+        pipeline = (
+            Pipeline()
+            .where("data.score", lambda score: score > 10)
+            .where("data.id", lambda key: key != "a")
+            .where("data.missing", lambda value: True)
+        )
+        assert list(pipeline(self.records())) == []
+
+    def test_select(self):
+        pipeline = Pipeline().select(["data.id", "data.tags[1]", "data.missing"])
+        assert list(pipeline(self.records()))[0] == {"data": {"id": "a", "tags": ["b"]}}
+
+    def test_select_indexes_once(self):
+        pipeline = Pipeline().select(
+            ["tags[-1]", "tags[0]", "tags[2]", "x[-1].a", "x[0].b"]
+        )
+        record = {"tags": [1, 2, 3], "x": [{"a": 1, "b": 2, "c": 3}]}
+        assert list(pipeline([record])) == [{"tags": [1, 3], "x": [{"a": 1, "b": 2}]}]
+
+    def test_select_in_scalars(self):
+        pipeline = Pipeline().select(["name[0]", "name.first"])
+        assert list(pipeline([{"name": "abc"}])) == [{}]
+
+    def test_set(self):
+        pipeline = Pipeline().set(
+            "meta.double", lambda record: record["data"]["score"] * 2
+        )
+        assert [record["meta"]["double"] for record in pipeline(self.records())] == [
+            24,
+            6,
+            84,
+        ]
+
+    def test_drop(self):
+        pipeline = (
+            Pipeline().drop(["data.secret"]).drop(["data.tags[0]", "data.missing"])
+        )
+        assert list(pipeline(self.records()))[0] == {
+            "data": {"id": "a", "score": 12, "tags": ["b"]}
+        }
+
+    def test_chain(self):
+        pipeline = (
+            Pipeline(sep="/")
+            .where("data/score", lambda score: score > 10)
+            .set("data/rank", lambda record: record["data"]["score"] // 10)
+            .drop(["data/secret", "data/tags"])
+            .select(["data/id", "data/rank"])
+        )
+        assert list(pipeline(self.records())) == [
+            {"data": {"id": "a", "rank": 1}},
+            {"data": {"id": "c", "rank": 4}},
+        ]
+
+
+class TestComputed:
+    def setup_method(self):
+        self.calls = 0
+        self.proxy = Cut({"data": {"ups": 10, "downs": 5, "title": "Scalpl"}})
+        self.proxy.computed(
+            "stats.ratio", self.ratio, depends_on=["data.ups", "data.downs"]
+        )
+
+    def ratio(self, proxy):
+        self.calls += 1
+        return proxy["data.ups"] / proxy["data.downs"]
+
+    def test_cached(self):
+        assert self.proxy["stats.ratio"] == 2
+        assert self.proxy.get("stats.ratio") == 2
+        assert self.calls == 1
+
+    def test_kept_by_unrelated_writes(self):
+        self.proxy["stats.ratio"]
+        self.proxy["data.title"] = "Scalpel"
+        assert self.proxy["stats.ratio"] == 2
+        assert self.calls == 1
+
+    @pytest.mark.parametrize(
+        "operation,result",
+        [
+            (lambda proxy: proxy.__setitem__("data.ups", 20), 4),
+            (lambda proxy: proxy.update({"data.downs": 10}), 1),
+            (lambda proxy: proxy.__setitem__("data", {"ups": 3, "downs": 3}), 1),
+            (lambda proxy: proxy.pop("data.downs"), None),
+            (lambda proxy: proxy.__delitem__("data.ups"), None),
+        ],
+    )
+    def test_recomputed_after_dependency_writes(self, operation, result):
+        self.proxy["stats.ratio"]
+        operation(self.proxy)
+        assert self.proxy.get("stats.ratio") == result
+        assert self.calls == 2
+
+
+class TestSubscribe:
+    def setup_method(self):
+        self.proxy = Cut({"a": {"b": [{"x": 1}, {"x": 2}]}, "c": 1})
+        self.changes = []
+
+    def callback(self, op, path, value):
+        self.changes.append((op, path, value))
+
+    def test_notified_of_writes_under_path(self):
+        self.proxy.subscribe("a.b", self.callback)
+        self.proxy["a.b[1].x"] = 3
+        self.proxy["c"] = 2
+        assert self.changes == [("set", "a.b[1].x", 3)]
+
+    def test_notified_of_writes_on_ancestors(self):
+        self.proxy.subscribe("a.b[1].x", self.callback)
+        self.proxy["a"] = {}
+        self.proxy.clear()
+        assert self.changes == [("set", "a", {}), ("clear", "", None)]
+
+    def test_notified_of_shifting_deletions(self):
+        self.proxy.subscribe("a.b[1].x", self.callback)
+        self.proxy.pop("a.b[0]")
+        self.proxy.setdefault("a.b[0].y", 42)
+        assert self.changes == [("delete", "a.b[0]", None)]
+
+    def test_notified_of_writes_at_either_end_of_lists(self):
+        self.proxy["a.b"].append({"x": 3})
+        self.proxy.subscribe("a.b[-1]", self.callback)
+        self.proxy.subscribe("a.b[0].x", self.callback)
+        self.proxy["a.b[2]"] = 9
+        self.proxy["a.b[-3].x"] = 7
+        self.proxy["a.b[1]"] = 8
+        assert self.changes == [("set", "a.b[2]", 9), ("set", "a.b[-3].x", 7)]
+
+    def test_notified_of_every_write_at_root(self):
+        self.proxy.subscribe("", self.callback)
+        self.proxy["a.b[1].x"] = 3
+        del self.proxy["c"]
+        self.proxy.clear()
+        assert self.changes == [
+            ("set", "a.b[1].x", 3),
+            ("delete", "c", None),
+            ("clear", "", None),
+        ]
+
+    def test_notified_once_per_change(self):
+        self.proxy.subscribe("a", self.callback)
+        self.proxy.subscribe("a.b", self.callback)
+        self.proxy["a.b[0].x"] = 3
+        assert self.changes == [("set", "a.b[0].x", 3)]
+
+    def test_unsubscribe(self):
+        unsubscribe = self.proxy.subscribe("a", self.callback)
+        unsubscribe()
+        self.proxy["a.b[0].x"] = 3
+        assert self.changes == []
+
+    def test_batch(self):
+        batches = []
+        self.proxy.subscribe("a", batches.append, batch=True)
+        self.proxy.update({"a.b[0].x": 3, "a.b[1].x": 4, "c": 2})
+        self.proxy["a.b[0].x"] = 5
+        assert batches == [
+            [("set", "a.b[0].x", 3), ("set", "a.b[1].x", 4)],
+            [("set", "a.b[0].x", 5)],
+        ]
+
+
+class TestTransaction:
+    def setup_method(self):
+        self.data = {"a": {"b": [{"x": 1}, {"x": 2}], "n": None}, "c": 1}
+        self.proxy = Cut(deepcopy(self.data))
+
+    def test_commit(self):
+        with self.proxy.transaction():
+            self.proxy["c"] = 2
+            del self.proxy["a.b[0]"]
+        assert self.proxy.data == {"a": {"b": [{"x": 2}], "n": None}, "c": 2}
+        assert self.proxy._observers == []
+
+    def test_rollback(self):
+        with pytest.raises(ValueError):
+            with self.proxy.transaction():
+                self.proxy.update({"c": 2, "a.b[1].x": 3, "d": 4})
+                del self.proxy["a.b[0]"]
+                self.proxy.pop("a.n")
+                self.proxy.setdefault("e.f", 5)
+                self.proxy.delete_many(["a.b[0]", "c"])
+                self.proxy.popitem()
+                raise ValueError
+        assert self.proxy.data == self.data
+
+    def test_rollback_keeps_key_order(self):
+        proxy = Cut(OrderedDict([("a", 1), ("b", 2), ("c", {"d": 3, "e": 4})]))
+        with pytest.raises(ValueError):
+            with proxy.transaction():
+                del proxy["a"]
+                proxy.pop("c.d")
+                proxy["a"] = 5
+                raise ValueError
+        assert list(proxy.data.items()) == [("a", 1), ("b", 2), ("c", {"d": 3, "e": 4})]
+        assert list(proxy["c"]) == ["d", "e"]
+
+    def test_rollback_created_containers(self):
+        self.proxy.autovivify = True
+        with pytest.raises(ValueError):
+            with self.proxy.transaction():
+                self.proxy["a.b[4].y[1]"] = 3
+                self.proxy["a.n.z"] = 4
+                self.proxy["g.h[0]"] = 5
+                raise ValueError
+        assert self.proxy.data == self.data
+
+    def test_rollback_clear_and_prune(self):
+        with pytest.raises(ValueError):
+            with self.proxy.transaction():
+                self.proxy.prune(lambda value: value == 1)
+                self.proxy.clear()
+                raise ValueError
+        assert self.proxy.data == self.data
+
+    def test_failed_write_is_harmless(self):
+        with pytest.raises(ValueError):
+            with self.proxy.transaction():
+                with pytest.raises(IndexError):
+                    self.proxy["a.b[5]"] = 3
+                with pytest.raises(KeyError):
+                    del self.proxy["a.missing"]
+                raise ValueError
+        assert self.proxy.data == self.data
+
+    def test_nested(self):
+        with self.proxy.transaction():
+            self.proxy["c"] = 2
+            with pytest.raises(ValueError):
+                with self.proxy.transaction():
+                    self.proxy["c"] = 3
+                    raise ValueError
+            assert self.proxy["c"] == 2
+        assert self.proxy["c"] == 2
+
+    def test_rollback_notifies_observers(self):
+        self.proxy.computed("double", lambda proxy: proxy["c"] * 2, ["c"])
+        assert self.proxy["double"] == 2
+        with pytest.raises(ValueError):
+            with self.proxy.transaction():
+                self.proxy["c"] = 5
+                assert self.proxy["double"] == 10
+                raise ValueError
+        assert self.proxy["double"] == 2
+
+
+@dataclass
+class Trainer:
+    name: str
+    team: list
+
+
+class Badge:
+    __slots__ = ("name", "city")
+
+    def __init__(self, name, city):
+        self.name = name
+        self.city = city
+
+
+Move = namedtuple("Move", ["name", "power"])
+
+
+class Row:
+    def __init__(self, **columns):
+        self.columns = columns
+
+
+class RowAdapter(Adapter):
+    def get(self, container, key):
+        return container.columns[key]
+
+    def set(self, container, key, value):
+        container.columns[key] = value
+
+    def delete(self, container, key):
+        del container.columns[key]
+
+
+register_adapter(Row, RowAdapter())
+
+
+class TestAdapters:
+    def setup_method(self):
+        self.proxy = Cut(
+            {
+                "trainer": Trainer(
+                    "Ash", [{"name": "Pikachu", "moves": [Move("Thunder", 110)]}]
+                ),
+                "badges": [Badge("Boulder", "Pewter")],
+                "row": Row(id=1),
+            }
+        )
+
+    def test_getitem(self):
+        assert self.proxy["trainer.name"] == "Ash"
+        assert self.proxy["trainer.team[0].moves[0].power"] == 110
+        assert self.proxy["trainer.team[0].moves[0][0]"] == "Thunder"
+        assert self.proxy["badges[0].city"] == "Pewter"
+        assert self.proxy["row.id"] == 1
+
+    def test_missing_attribute(self):
+        with pytest.raises(KeyError):
+            self.proxy["trainer.age"]
+        assert self.proxy.get("badges[0].leader", "Brock") == "Brock"
+        assert "trainer.name" in self.proxy
+        assert "trainer.age" not in self.proxy
+
+    def test_setitem(self):
+        self.proxy["trainer.name"] = "Red"
+        self.proxy["badges[0].city"] = "Viridian"
+        self.proxy["row.id"] = 2
+        assert self.proxy["trainer"].name == "Red"
+        assert self.proxy["badges[0]"].city == "Viridian"
+        assert self.proxy["row"].columns == {"id": 2}
+
+    def test_autovivify(self):
+        self.proxy.autovivify = True
+        self.proxy["trainer.team[0].stats.hp"] = 35
+        self.proxy["row.meta.source"] = "csv"
+        assert self.proxy["trainer"].team[0]["stats"] == {"hp": 35}
+        assert self.proxy["row"].columns["meta"] == {"source": "csv"}
+
+    def test_setdefault(self):
+        assert self.proxy.setdefault("trainer.name", "Red") == "Ash"
+        assert self.proxy.setdefault("row.meta.source", "csv") == "csv"
+        assert self.proxy["row"].columns == {"id": 1, "meta": {"source": "csv"}}
+
+    def test_delitem_and_pop(self):
+        del self.proxy["badges[0].city"]
+        assert "badges[0].city" not in self.proxy
+        assert self.proxy.pop("row.id") == 1
+        assert self.proxy.pop("row.id", None) is None
+        with pytest.raises(KeyError):
+            del self.proxy["badges[0].city"]
+
+    def test_read_only(self):
+        with pytest.raises(AttributeError):
+            self.proxy["trainer.team[0].moves[0].power"] = 120
+
+    def test_unsupported(self):
+        with pytest.raises(TypeError):
+            self.proxy["trainer.name.first"]
+
+    def test_transaction(self):
+        with pytest.raises(ValueError):
+            with self.proxy.transaction():
+                self.proxy["trainer.name"] = "Red"
+                self.proxy.pop("row.id")
+                raise ValueError
+        assert self.proxy["trainer.name"] == "Ash"
+        assert self.proxy["row.id"] == 1
+
+
+class TestToJson:
+    def setup_method(self):
+        self.proxy = Cut(
+            {"a": {"b": [{"x": 1}, {"x": 2.5, "é": None}], "c": True}, "d": {1: "one"}}
+        )
+
+    def expected(self):
+        return json.dumps(self.proxy.data, separators=(",", ":")).encode()
+
+    def test_encode(self):
+        assert self.proxy.to_json() == self.expected()
+        assert self.proxy.to_json(cache=False) == self.expected()
+
+    @pytest.mark.parametrize(
+        "write",
+        [
+            lambda proxy: proxy.__setitem__("a.b[1].x", 3),
+            lambda proxy: proxy.__setitem__("a.b[-1].x", 4),
+            lambda proxy: proxy.__setitem__("e", [1]),
+            lambda proxy: proxy.__delitem__("a.b[0]"),
+            lambda proxy: proxy.pop("a.c", None),
+            lambda proxy: proxy.setdefault("a.f.g", 5),
+            lambda proxy: proxy.update({"a.b[0].x": 6, "d.1": "uno"}),
+            lambda proxy: proxy.delete_many(["a.b[0].x", "d"]),
+            lambda proxy: proxy.prune(lambda value: value is None),
+            lambda proxy: proxy.clear(),
+        ],
+    )
+    def test_encode_after_write(self, write):
+        for _ in range(2):
+            self.proxy.to_json()
+            write(self.proxy)
+            assert self.proxy.to_json() == self.expected()
+
+    def test_reuse_fragments(self):
+        self.proxy.to_json()
+        for value in range(3):
+            self.proxy["a.b[0].x"] = value
+            self.proxy.to_json()
+        fragments = self.proxy._observer(JsonFragments)
+        assert fragments._root.children["d"].value == b'{"1":"one"}'
+        assert fragments._root.children["a"].children["c"].value == b"true"
+        assert fragments._root.children["a"].children["b"].children[1].value
+
+    def test_write_encodes_only_its_path(self, monkeypatch):
+        self.proxy.to_json()
+        encoded = []
+        leaf = JsonFragments.leaf
+        monkeypatch.setattr(
+            JsonFragments,
+            "leaf",
+            lambda self, value: encoded.append(value) or leaf(self, value),
+        )
+        self.proxy["a.b[1].x"] = 3
+        self.proxy.to_json()
+        # The siblings met on the way are encoded once, and only them.
+        assert len(encoded) == 5 and 3 in encoded
+        encoded.clear()
+        self.proxy["a.b[-1].é"] = 0
+        assert self.proxy.to_json() == self.expected()
+        assert encoded == [0]
+
+    def test_stale_after_write_by_other_means(self):
+        encoded = self.proxy.to_json()
+        self.proxy["a.b"].append(3)
+        assert self.proxy.to_json() == encoded
+        assert self.proxy.to_json(cache=False) == self.expected()
+
+
+class TestFingerprint:
+    def setup_method(self):
+        self.proxy = Cut({"a": {"b": [{"x": 1}, {"x": 2}], "c": "d"}, "e": None})
+
+    def test_equal_values(self):
+        other = Cut({"e": None, "a": {"c": "d", "b": [{"x": 1.0}, {"x": 2}]}})
+        assert self.proxy.fingerprint() == other.fingerprint()
+        assert self.proxy.fingerprint("a.b[0]") == Cut({"x": True}).fingerprint()
+
+    def test_different_values(self):
+        fingerprints = {
+            Cut(data).fingerprint()
+            for data in [
+                {"a": [1, 2]},
+                {"a": [2, 1]},
+                {"a": (1, 2)},
+                {"a": "1"},
+                {"a": 1.5},
+                {"a": None},
+                {"a": {}},
+                {"a": []},
+                {1: 1},
+            ]
+        }
+        assert len(fingerprints) == 9
+
+    def test_invalidated_by_writes(self):
+        before = self.proxy.fingerprint()
+        untouched = self.proxy.fingerprint("a.c")
+        self.proxy["a.b[1].x"] = 3
+        assert self.proxy.fingerprint() != before
+        assert self.proxy.fingerprint("a.c") == untouched
+        assert self.proxy.fingerprint() == Cut(deepcopy(self.proxy.data)).fingerprint()
+        self.proxy["a.b[-1].x"] = 2
+        assert self.proxy.fingerprint() == before
+
+    def test_missing_path(self):
+        with pytest.raises(KeyError):
+            self.proxy.fingerprint("a.z")
+        with pytest.raises(IndexError):
+            self.proxy.fingerprint("a.b[2]")
+
+    def test_equality(self):
+        other = Cut(deepcopy(self.proxy.data))
+        assert self.proxy.fingerprint() == other.fingerprint()
+        other["a.c"] = "z"
+        assert self.proxy.fingerprint() != other.fingerprint()
+        del other["a.c"]
+        assert self.proxy.fingerprint() != other.fingerprint()
+
+    def test_stale_after_write_by_other_means(self):
+        other = Cut(deepcopy(self.proxy.data))
+        assert self.proxy.fingerprint() == other.fingerprint()
+        other["a.b"].append(3)
+        assert self.proxy.fingerprint() == other.fingerprint()
+        assert self.proxy != other
+
+
+class TestRecords:
+    records = [
+        {"name": "Bulbasaur", "type": "Grass", "stats": {"level": 12}},
+        {"name": "Squirtle", "type": "Water", "stats": {"level": 16}},
+        {"name": "Oddish", "type": "Grass"},
+        {"name": "Psyduck", "type": "Water", "stats": {"level": 12}},
+    ]
+
+    def names(self, records):
+        return [record["name"] for record in records]
+
+    def test_sort_by(self):
+        assert self.names(sort_by(self.records, "stats.level", default=0)) == [
+            "Oddish",
+            "Bulbasaur",
+            "Psyduck",
+            "Squirtle",
+        ]
+        assert self.names(
+            sort_by(iter(self.records), "stats.level", reverse=True, default=0)
+        ) == ["Squirtle", "Bulbasaur", "Psyduck", "Oddish"]
+
+    def test_sort_by_missing_path(self):
+        with pytest.raises(KeyError):
+            sort_by(self.records, "stats.level")
+
+    def test_group_by(self):
+        groups = group_by(self.records, "type")
+        assert list(groups) == ["Grass", "Water"]
+        assert self.names(groups["Water"]) == ["Squirtle", "Psyduck"]
+        assert list(group_by(self.records, "stats.level", default=None)) == [
+            12,
+            16,
+            None,
+        ]
+
+    def test_top_k(self):
+        assert self.names(top_k(self.records, "stats.level", 2, default=0)) == [
+            "Squirtle",
+            "Bulbasaur",
+        ]
+        assert self.names(
+            top_k(self.records, "stats.level", 1, default=0, largest=False)
+        ) == ["Oddish"]
+        with pytest.raises(KeyError):
+            top_k(self.records, "stats.level", 2)
+
+    def test_custom_separator(self):
+        records = [{"a": {"b": 2}}, {"a": {"b": 1}}]
+        assert sort_by(records, "a/b", sep="/") == records[::-1]
+
+
+class TestMemoryUsage:
+    def setup_method(self):
+        self.big = [str(i) * 100 for i in range(100)]
+        self.proxy = Cut({"a": {"big": self.big, "small": [1]}, "b": "c"})
+
+    def test_heaviest_paths(self):
+        usage = self.proxy.memory_usage()
+        assert [path for path, _ in usage] == ["a", "a.big", "a.small", "b"]
+        expected = sys.getsizeof(self.big) + sum(map(sys.getsizeof, self.big))
+        assert dict(usage)["a.big"] == expected
+
+    def test_max_depth_and_top(self):
+        assert [path for path, _ in self.proxy.memory_usage(max_depth=1)] == [
+            "a",
+            "b",
+        ]
+        usage = self.proxy.memory_usage(max_depth=None, top=3)
+        assert [path for path, _ in usage][:2] == ["a", "a.big"]
+        assert usage[2][0].startswith("a.big[")
+
+    def test_shared_objects_counted_once(self):
+        self.proxy["b"] = self.big
+        usage = dict(self.proxy.memory_usage())
+        assert "b" not in usage
+        assert usage["a"] > usage["a.big"]
+
+    def test_sample(self):
+        usage = dict(self.proxy.memory_usage(sample=10))
+        exact = dict(self.proxy.memory_usage())
+        assert usage["a.big"] == pytest.approx(exact["a.big"], rel=0.05)
+        assert "a.big[1]" not in dict(self.proxy.memory_usage(None, 200, sample=10))
+
+
+class TestValidator:
+    validator = Validator(
+        {
+            "data.modhash": str,
+            "data.children[0].data.score": int,
+            "data.children[0].data.title": (str, type(None)),
+            "data.children[1].data.id": object,
+            "data.dist": int,
+        }
+    )
+
+    def document(self):
+        return {
+            "data": {
+                "modhash": "",
+                "children": [
+                    {"data": {"score": 10, "title": None}},
+                    {"data": {"id": "cmq4jj"}},
+                ],
+                "dist": 2,
+            }
+        }
+
+    def test_valid(self):
+        assert self.validator.validate(self.document()) == []
+
+    def test_every_failure_in_schema_order(self):
+        document = self.document()
+        document["data"]["children"] = [{"data": {"score": "10", "title": 1}}]
+        del document["data"]["modhash"]
+        assert self.validator(document) == [
+            ("data.modhash", "missing"),
+            ("data.children[0].data.score", "expected int, got str"),
+            ("data.children[0].data.title", "expected str or NoneType, got int"),
+            ("data.children[1].data.id", "missing"),
+        ]
+
+    def test_missing_prefix(self):
+        assert self.validator.validate({"data": []}) == [
+            (path, "missing") for path in self.validator.schema
+        ]
+        assert len(self.validator.validate(None)) == 5
+
+    def test_custom_separator(self):
+        validator = Validator({"a/b": int}, sep="/")
+        assert validator.validate({"a": {"b": 1}}) == []
+
+
+class TestAt:
+    def setup_method(self):
+        self.proxy = Cut({"a": {"b": [{"x": 1}, {"x": 2}]}, "c": 1})
+
+    def test_lookups_and_writes(self):
+        handle = self.proxy.at("a.b[1]")
+        assert handle["x"] == 2
+        handle["y"] = 3
+        assert self.proxy["a.b[1].y"] == 3
+        assert "y" in handle
+        assert handle.pop("y") == 3
+        assert self.proxy.at("a.b[1]") is handle
+
+    def test_missing_anchor(self):
+        with pytest.raises(KeyError):
+            self.proxy.at("a.z")
+        with pytest.raises(IndexError):
+            self.proxy.at("a.b[2]")
+
+    def test_follows_replaced_anchor(self):
+        handle = self.proxy.at("a.b[1]")
+        self.proxy["a"] = {"b": [{"x": 3}, {"x": 4}]}
+        assert handle["x"] == 4
+        self.proxy.pop("a.b[0]")
+        with pytest.raises(IndexError):
+            handle["x"]
+        self.proxy["a.b"] = [{"x": 5}, {"x": 6}]
+        assert handle["x"] == 6
+        handle.data = {"x": 7}
+        assert self.proxy["a.b[1].x"] == 7
+
+    def test_writes_notified_to_parent(self):
+        self.proxy.track_changes()
+        handle = self.proxy.at("a.b[0]")
+        handle["x"] = 3
+        assert self.proxy.drain_changes() == [("set", ("a", "b", 0, "x"), 3)]
+        handle.clear()
+        assert self.proxy.drain_changes() == [("delete", ("a", "b", 0, "x"), None)]
+
+    def test_transaction(self):
+        handle = self.proxy.at("a.b[0]")
+        with pytest.raises(ValueError):
+            with self.proxy.transaction():
+                handle["x"] = 3
+                handle.clear()
+                raise ValueError
+        assert self.proxy["a.b[0].x"] == 1
+
+    def test_parent_writes_notified_to_handle(self):
+        handle = self.proxy.at("a")
+        changes = []
+        handle.subscribe("b", lambda *change: changes.append(change))
+        nested = handle.at("b[1]")
+        self.proxy["a.b[0].x"] = 3
+        self.proxy["c"] = 2
+        nested["x"] = 4
+        assert changes == [("set", "b[0].x", 3), ("set", "b[1].x", 4)]
+        assert self.proxy["a.b[1].x"] == 4
+
+    def test_cached_fragments_of_handle(self):
+        handle = self.proxy.at("a")
+        assert handle.to_json() == b'{"b":[{"x":1},{"x":2}]}'
+        self.proxy["a.b[0].x"] = 3
+        assert handle.to_json() == b'{"b":[{"x":3},{"x":2}]}'
+        self.proxy["a"] = {}
+        assert handle.to_json() == b"{}"